@@ -1,65 +1,316 @@
-import os, time, random
+import os, sys, time, heapq, random, argparse
+import multiprocessing as mp
+from queue import Empty
+from instance import load_instance, read_stdin
+from bounds import lower_bound
+from results_store import record
 
-def variance(values):
-    n = len(values)
-    if n == 0:
-        return 0
-    mean = sum(values) / n
-    return sum((x - mean) ** 2 for x in values) / n
+class State:
+    """
+    Nghiệm hiện tại cùng histogram tải count[c] = số reviewer có tải c, cập
+    nhật mỗi khi một reviewer được gán/bỏ gán. Fitness (tải lớn nhất, phương
+    sai, số reviewer quá tải) đọc ra từ histogram trong O(tải lớn nhất) thay vì
+    duyệt cả M reviewer, nên một vòng lặp chỉ tốn O(số paper bị thay đổi).
 
-def add_assignment(sol, loads, paper_idx, reviewers):
-    sol[paper_idx] = reviewers[:]
-    for r in reviewers:
-        loads[r] += 1
+    Mọi paper bị bỏ gán được ghi vào nhật ký undo kèm reviewer cũ; rollback()
+    trả nghiệm về đúng trạng thái lúc commit() gần nhất.
+    """
+
+    def __init__(self, N, M, b):
+        self.M     = M
+        self.sol   = [[] for _ in range(N)]
+        self.load  = [0] * (M + 1)         # 1-based, load[0] bỏ trống
+        self.count = [0] * (N + 2)         # tải không thể vượt N
+        self.count[0] = M
+        self.top   = 0                     # cận trên của tải lớn nhất
+        self.avg   = b * N / M if M else 0
+        self.log   = []                    # (paper, reviewer cũ) từ lần commit trước
+        self.index = None                  # LoadSumIndex, dựng khi cần lần đầu
+
+    def assign(self, paper_idx, reviewers):
+        self.sol[paper_idx] = reviewers[:]
+        load, count, top = self.load, self.count, self.top
+        for r in reviewers:
+            l = load[r]
+            load[r] = l + 1
+            count[l] -= 1
+            count[l + 1] += 1
+            if l >= top:
+                top = l + 1
+        self.top = top
+
+    def unassign(self, paper_idx):
+        old = self.sol[paper_idx]
+        self.log.append((paper_idx, old))
+        load, count = self.load, self.count
+        for r in old:
+            l = load[r]
+            load[r] = l - 1
+            count[l] -= 1
+            count[l - 1] += 1
+        self.sol[paper_idx] = []
+
+    def commit(self):
+        if self.index is not None:
+            self.index.update(self, self.log)
+        self.log.clear()
+
+    def rollback(self):
+        load, count, sol = self.load, self.count, self.sol
+        changed = [(i, old) for i, old in self.log if sol[i] != old]
+        for paper_idx, _ in changed:
+            for r in sol[paper_idx]:
+                l = load[r]
+                load[r] = l - 1
+                count[l] -= 1
+                count[l - 1] += 1
+        top = self.top
+        for paper_idx, old in changed:
+            for r in old:
+                l = load[r]
+                load[r] = l + 1
+                count[l] -= 1
+                count[l + 1] += 1
+                if l >= top:
+                    top = l + 1
+        self.top = top
+        for paper_idx, old in self.log:
+            sol[paper_idx] = old
+        self.log.clear()
+
+    @property
+    def max(self):
+        count, top = self.count, self.top
+        while top and not count[top]:
+            top -= 1
+        self.top = top
+        return top
+
+    def fitness(self, alpha=0.9, beta=0.05, gamma=0.05):
+        count, M, avg = self.count, self.M, self.avg
+        maxL  = self.max
+        total = sumsq = over = 0
+        for c in range(1, maxL + 1):
+            n = count[c]
+            total += c * n
+            sumsq += c * c * n
+            if c > avg:
+                over += n
+        mean = total / M
+        varL = sumsq / M - mean * mean
+        return alpha * maxL + beta * varL + gamma * over
+
+    def loads(self):
+        return {r: self.load[r] for r in range(1, self.M + 1)}
+
+    def paper_index(self):
+        if self.index is None:
+            self.index = LoadSumIndex(self)
+        return self.index
+
+    def heaviest(self):
+        """
+        Sinh reviewer theo tải giảm dần (hoà thì ID nhỏ trước) từ các bucket
+        tải của chỉ mục; histogram bỏ qua tải rỗng, nên lấy vài reviewer nặng
+        nhất không phải sắp xếp cả M reviewer. Dùng trên nghiệm đã commit.
+        """
+        by_load, count = self.paper_index().by_load, self.count
+        for l in range(self.max, -1, -1):
+            if count[l]:
+                h = list(by_load[l])
+                heapq.heapify(h)
+                while h:
+                    yield heapq.heappop(h)
+
+class LoadSumIndex:
+    """
+    Chỉ mục ưu tiên cho worst_load_destroy trên nghiệm đã commit:
+        psum[i]   = tổng tải các reviewer của paper i
+        bucket[s] = tập paper có psum = s
+        papers[r] = tập paper đang gán cho reviewer r
+        by_load[l] = tập reviewer có tải l
 
-def remove_assignment(sol, loads, paper_idx):
-    for r in sol[paper_idx]:
-        loads[r] -= 1
-    sol[paper_idx].clear()
+    Nghiệm bị từ chối được rollback về đúng trạng thái đã commit nên chỉ mục
+    chỉ cần cập nhật ở commit(): reviewer có tải thay đổi d thì mọi paper của
+    nó dịch d bucket. Lấy k paper tệ nhất đi từ bucket cao nhất xuống, không
+    phải sắp xếp cả N paper.
+    """
 
-def fitness(loads, M, avg_load, alpha=0.9, beta=0.05, gamma=0.05):
-    load_values = [loads.get(j, 0) for j in range(1, M + 1)]
-    maxL = max(load_values)
-    varL = variance(load_values)
-    overload_count = sum(1 for l in load_values if l > avg_load)
-    return alpha * maxL + beta * varL + gamma * overload_count
+    def __init__(self, state):
+        sol, load = state.sol, state.load
+        self.papers = [set() for _ in range(state.M + 1)]
+        for i, revs in enumerate(sol):
+            for r in revs:
+                self.papers[r].add(i)
+        self.psum   = [sum(load[r] for r in revs) for revs in sol]
+        self.bucket = {}
+        for i, v in enumerate(self.psum):
+            self.bucket.setdefault(v, set()).add(i)
+        self.top = max(self.psum, default=0)
+        self.by_load = {}
+        for r in range(1, state.M + 1):
+            self.by_load.setdefault(load[r], set()).add(r)
+
+    def _move(self, i, v):
+        old = self.psum[i]
+        if old == v:
+            return
+        self.bucket[old].discard(i)
+        self.bucket.setdefault(v, set()).add(i)
+        self.psum[i] = v
+        if v > self.top:
+            self.top = v
+
+    def update(self, state, log):
+        sol, load, papers = state.sol, state.load, self.papers
+        changed = {}
+        for i, old in log:
+            changed.setdefault(i, old)         # lần ghi đầu là reviewer lúc commit
+        delta = {}
+        for i, old in changed.items():
+            for r in old:
+                delta[r] = delta.get(r, 0) - 1
+                papers[r].discard(i)
+            for r in sol[i]:
+                delta[r] = delta.get(r, 0) + 1
+                papers[r].add(i)
+        psum, by_load = self.psum, self.by_load
+        for r, d in delta.items():
+            if d:
+                by_load[load[r] - d].discard(r)
+                by_load.setdefault(load[r], set()).add(r)
+                for i in papers[r]:
+                    if i not in changed:
+                        self._move(i, psum[i] + d)
+        for i in changed:
+            self._move(i, sum(load[r] for r in sol[i]))
+
+    def worst(self, k):
+        """k paper có psum lớn nhất, hoà thì paper chỉ số nhỏ trước (như sorted ổn định)."""
+        bucket = self.bucket
+        while self.top > 0 and not bucket.get(self.top):
+            self.top -= 1
+        out, v = [], self.top
+        while len(out) < k and v >= 0:
+            B = bucket.get(v)
+            if B:
+                need = k - len(out)
+                out.extend(sorted(B) if len(B) <= need else heapq.nsmallest(need, B))
+            v -= 1
+        return out
 
 def initial_solution(N, M, b, L):
-    sol   = [[] for _ in range(N)]
-    loads = {i: 0 for i in range(1, M + 1)}
+    state = State(N, M, b)
     for i in range(N):
-        cand = sorted(L[i], key=lambda r: loads[r])
-        add_assignment(sol, loads, i, cand[:b])
-    return sol, loads
+        cand = sorted(L[i], key=lambda r: state.load[r])
+        state.assign(i, cand[:b])
+    return state
 
-def random_destroy(sol, loads, ratio):
-    N = len(sol)
+def state_from(N, M, b, sol):
+    state = State(N, M, b)
+    for i, reviewers in enumerate(sol):
+        state.assign(i, reviewers)
+    return state
+
+def random_destroy(state, ratio, L):
+    N = len(state.sol)
     k = max(1, int(N * ratio))
     removed = random.sample(range(N), k)
     for i in removed:
-        remove_assignment(sol, loads, i)
+        state.unassign(i)
     return removed
 
-def worst_load_destroy(sol, loads, ratio):
-    N = len(sol)
+def worst_load_destroy(state, ratio, L):
+    N = len(state.sol)
     k = max(1, int(N * ratio))
-    idx = sorted(range(N),
-                key=lambda i: sum(loads.get(r, 0) for r in sol[i]),
-                reverse=True)[:k]
+    idx = state.paper_index().worst(k)
     for i in idx:
-        remove_assignment(sol, loads, i)
+        state.unassign(i)
     return idx
 
-def greedy_repair(sol, loads, removed, b, L):
+def _take_papers(state, reviewers, k):
+    """Các paper (nghiệm đã commit) của lần lượt từng reviewer, tối đa k paper."""
+    papers, seen, out = state.paper_index().papers, set(), []
+    for r in reviewers:
+        for i in sorted(papers[r]):
+            if i not in seen:
+                seen.add(i)
+                out.append(i)
+        if len(out) >= k:
+            break
+    return out[:k]
+
+def top_reviewer_destroy(state, ratio, L):
+    """Bỏ gán paper của các reviewer tải cao nhất — chỉ những paper quyết định max."""
+    N = len(state.sol)
+    k = max(1, int(N * ratio))
+    pool = _take_papers(state, state.heaviest(), 2 * k)
+    removed = random.sample(pool, min(k, len(pool)))
+    for i in removed:
+        state.unassign(i)
+    return removed
+
+def related_destroy(state, ratio, L):
+    """
+    Chọn ngẫu nhiên một reviewer tải lớn nhất r*, bỏ gán paper của nó và của
+    các reviewer cùng xuất hiện trong L(i) với các paper đó (nặng trước): muốn
+    giảm tải r* thì chính những reviewer này phải nhận thêm paper.
+    """
+    N, load, index = len(state.sol), state.load, state.paper_index()
+    k = max(1, int(N * ratio))
+    heavy = sorted(index.by_load[state.max])
+    seed = random.choice(heavy)
+    related = {r for i in index.papers[seed] for r in L[i]}
+    related.discard(seed)
+    order = [seed] + sorted(related, key=lambda r: (-load[r], r))
+    removed = _take_papers(state, order, k)
+    for i in removed:
+        state.unassign(i)
+    return removed
+
+def greedy_repair(state, removed, b, L):
+    load = state.load
     for i in removed:
-        cand = sorted(L[i], key=lambda r: loads[r])
-        add_assignment(sol, loads, i, cand[:b])
+        cand = sorted(L[i], key=lambda r: load[r])
+        state.assign(i, cand[:b])
 
-def random_repair(sol, loads, removed, b, L):
+def random_repair(state, removed, b, L):
     for i in removed:
         cand = L[i][:]
         random.shuffle(cand)
-        add_assignment(sol, loads, i, cand[:b])
+        state.assign(i, cand[:b])
+
+# ---------- registry -----------------------------------------------
+# Toán tử phá huỷ: (state, ratio, L) -> danh sách paper bị bỏ gán.
+# Toán tử xây lại: (state, removed, b, L). Mục tiêu: state -> số cần cực tiểu.
+# Tiêu chí chấp nhận: (val, best_val, new_max, cur_max) -> bool.
+DESTROY = {
+    "random":       random_destroy,
+    "worst_load":   worst_load_destroy,
+    "top_reviewer": top_reviewer_destroy,
+    "related":      related_destroy,
+}
+REPAIR = {
+    "greedy": greedy_repair,
+    "random": random_repair,
+}
+OBJECTIVES = {
+    "fitness": lambda state: state.fitness(),   # tải lớn nhất + phương sai + quá tải
+    "max":     lambda state: state.max,         # chỉ tải lớn nhất
+}
+
+def accept_improve(val, best_val, new_max, cur_max):
+    # không nhận nghiệm làm tăng tải lớn nhất dù fitness tổng có giảm
+    return val < best_val and new_max <= cur_max
+
+def accept_plateau(val, best_val, new_max, cur_max):
+    # nhận cả nghiệm ngang bằng để đi ngang trên vùng bằng phẳng của max
+    return val <= best_val and new_max <= cur_max
+
+ACCEPT = {
+    "improve": accept_improve,
+    "plateau": accept_plateau,
+}
 
 def choose(ops, weights):
     return random.choices(range(len(ops)), weights=weights, k=1)[0]
@@ -71,60 +322,221 @@ def update_weights(weights, idx, reward, decay=0.9):
         else:
             weights[i] = decay * weights[i]
 
-def alns(N, M, b, L, max_iter=1000, seed=42):
+def alns(N, M, b, L, max_iter=None, seed=42, lb=0, time_limit=10.0,
+         ratio=0.15, min_ratio=0.005, max_ratio=0.3, exchange=None,
+         objective="fitness", accept="improve", destroy=None, repair=None):
+    """
+    Dừng khi chạm lb, hết time_limit giây hoặc hết max_iter vòng (None = không
+    giới hạn). Tỉ lệ phá huỷ tự điều chỉnh: thu hẹp khi tìm được nghiệm tốt
+    hơn (tập trung quanh nút cổ chai), nới dần sau mỗi lần thất bại.
+
+    objective, accept, destroy, repair là tên trong OBJECTIVES, ACCEPT,
+    DESTROY, REPAIR (destroy/repair = None: dùng mọi toán tử đã đăng ký).
+    exchange (chế độ đảo, xem island_alns) được gọi sau mỗi exchange.every
+    vòng để gửi nghiệm tốt nhất đi và nhận nghiệm tốt hơn từ đảo khác.
+    Trả về State cuối cùng (không bao giờ có tải lớn nhất cao hơn nghiệm đầu).
+    """
     random.seed(seed)
-    destroy_ops = [random_destroy, worst_load_destroy]
-    repair_ops  = [greedy_repair, random_repair]
+    destroy_ops = [DESTROY[name] for name in (destroy or DESTROY)]
+    repair_ops  = [REPAIR[name] for name in (repair or REPAIR)]
+    evaluate    = OBJECTIVES[objective]
+    accepts     = ACCEPT[accept]
     dw, rw = [1.0]*len(destroy_ops), [1.0]*len(repair_ops)
 
-    avg_load        = b * N / M
-    current, loads  = initial_solution(N, M, b, L)
-    best_val        = fitness(loads, M, avg_load)
+    deadline = time.time() + time_limit if time_limit is not None else None
+    state    = initial_solution(N, M, b, L)
+    best_val = evaluate(state)
+    cur_max  = state.max
+    it       = 0
 
-    for _ in range(max_iter):
+    while max_iter is None or it < max_iter:
+        if cur_max <= lb:                   # đã chạm cận dưới → tối ưu
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+        it  += 1
         didx = choose(destroy_ops, dw)
         ridx = choose(repair_ops,  rw)
 
-        saved_sol  = [r[:] for r in current]
-        saved_load = loads.copy()
-
-        removed = destroy_ops[didx](current, loads, ratio=0.15)
-        repair_ops[ridx](current, loads, removed, b, L)
-        val = fitness(loads, M, avg_load)
+        removed = destroy_ops[didx](state, ratio, L)
+        repair_ops[ridx](state, removed, b, L)
+        val = evaluate(state)
 
-        if val < best_val:
+        if accepts(val, best_val, state.max, cur_max):
             best_val = val
+            cur_max  = state.max
+            state.commit()
+            ratio = max(min_ratio, ratio * 0.8)
             update_weights(dw, didx, reward=2)
             update_weights(rw, ridx, reward=2)
         else:
-            current, loads = saved_sol, saved_load
+            state.rollback()                # chỉ hoàn tác các paper vừa bị phá
+            ratio = min(max_ratio, ratio * 1.02)
             update_weights(dw, didx, reward=0.1)
             update_weights(rw, ridx, reward=0.1)
 
-    return loads            # trả về dict tải reviewer
+        if exchange is not None and it % exchange.every == 0:
+            stop, sol = exchange.step(state.sol, best_val, cur_max)
+            if stop:
+                break
+            if sol is not None:             # nhận nghiệm của đảo bên cạnh
+                state    = state_from(N, M, b, sol)
+                best_val = evaluate(state)
+                cur_max  = state.max
+
+    return state
+
+# ---------- island model -------------------------------------------
+class Exchange:
+    """
+    Kênh trao đổi của một đảo trong vòng tròn: gửi nghiệm tốt nhất sang đảo
+    kế tiếp (chỉ khi đã cải thiện kể từ lần gửi trước), nhận nghiệm của đảo
+    liền trước. Hàng đợi không chặn nên các đảo không phải chờ nhau.
+    """
+
+    def __init__(self, inbox, outbox, done, every, accepts=accept_improve):
+        self.inbox, self.outbox = inbox, outbox
+        self.done    = done
+        self.every   = every
+        self.accepts = accepts
+        self.sent    = None
+
+    def step(self, sol, val, cur_max):
+        if self.done.is_set():
+            return True, None
+        if self.sent is None or (cur_max, val) < self.sent:
+            self.sent = (cur_max, val)
+            self.outbox.put((cur_max, val, sol))
+        best = None
+        while True:
+            try:
+                msg = self.inbox.get_nowait()
+            except Empty:
+                break
+            if best is None or msg[:2] < best[:2]:
+                best = msg
+        # cùng tiêu chí chấp nhận với alns
+        if best is not None and self.accepts(best[1], val, best[0], cur_max) and best[:2] != (cur_max, val):
+            self.sent = best[:2]            # đảo sau đã có nghiệm tốt hơn
+            return False, best[2]
+        return False, None
+
+def _island(k, N, M, b, L, seed, lb, inbox, outbox, done, results, every, opts):
+    outbox.cancel_join_thread()             # thoát được dù đảo sau chưa đọc hết
+    ex    = Exchange(inbox, outbox, done, every, ACCEPT[opts.get("accept", "improve")])
+    # seed + k: mỗi đảo một dòng ngẫu nhiên riêng
+    state = alns(N, M, b, L, seed=seed + k, lb=lb, exchange=ex, **opts)
+    if state.max <= lb:
+        done.set()                          # báo các đảo khác dừng
+    results.put((state.max, k, state.sol))
+
+def island_alns(N, M, b, L, islands=None, seed=42, lb=0, every=300, **opts):
+    """
+    Chạy `islands` ALNS độc lập trong các tiến trình con (mặc định bằng số
+    CPU), mỗi đảo có seed và trọng số toán tử riêng, trao đổi nghiệm tốt nhất
+    theo vòng tròn sau mỗi `every` vòng lặp. opts được chuyển nguyên cho
+    alns(). Trả về State của đảo tốt nhất trong các đảo chạy xong; đảo chết
+    giữa chừng (OOM, exception) bị bỏ qua thay vì làm treo tiến trình chính.
+    """
+    islands = islands or os.cpu_count() or 1
+    if islands == 1 or mp.current_process().daemon:
+        # tiến trình daemon (vd. job của batch_runner) không được tạo tiến trình con
+        return alns(N, M, b, L, seed=seed, lb=lb, **opts)
+
+    queues  = [mp.Queue() for _ in range(islands)]
+    done    = mp.Event()
+    results = mp.Queue()
+    procs = [mp.Process(target=_island, daemon=True,
+                        args=(k, N, M, b, L, seed, lb, queues[k], queues[(k + 1) % islands],
+                              done, results, every, opts))
+             for k in range(islands)]
+    for p in procs:
+        p.start()
+    got = {}
+    while len(got) < islands:
+        try:
+            res = results.get(timeout=0.5)
+            got[res[1]] = res
+        except Empty:
+            if any(p.is_alive() for p in procs):
+                continue
+            # mọi đảo đã thoát: lấy nốt kết quả còn trên đường ống rồi thôi chờ
+            while True:
+                try:
+                    res = results.get(timeout=0.1)
+                    got[res[1]] = res
+                except Empty:
+                    break
+            break
+    for p in procs:
+        p.join()
+    if not got:
+        codes = [p.exitcode for p in procs]
+        raise RuntimeError(f"Không đảo ALNS nào chạy xong (exit codes {codes})")
+    best = min(got.values())
+    return state_from(N, M, b, best[2])
 
 # ---------- I/O ----------------------------------------------------
 def read_instance(path):
-    with open(path, "r") as f:
-        N, M, b = map(int, f.readline().split())
-        L = []
-        for _ in range(N):
-            tokens = list(map(int, f.readline().split()))
-            k, reviewers = tokens[0], tokens[1:]
-            assert len(reviewers) == k
-            L.append(reviewers)
-    return N, M, b, L
-
-def write_result(out_path, n, m, obj, runtime_ms):
+    inst = load_instance(path)
+    return inst.N, inst.M, inst.b, inst.to_lists(one_based=True)
+
+def write_result(out_path, n, m, obj, runtime_ms, status="FEASIBLE"):
     with open(out_path, "w") as f:
         f.write(f"{os.path.basename(out_path)}\n")
         f.write(f"n = {n}\n")
         f.write(f"m = {m}\n")
-        f.write(f"Objective Value: {obj}\n")
+        f.write(f"Objective Value: {obj} {status}\n")
         f.write(f"{runtime_ms} ms\n")
 
+def run_instance(in_path, out_path, seed=42, max_iter=None, time_limit=10.0, islands=1):
+    inst = load_instance(in_path)
+    N, M, b, L = inst.N, inst.M, inst.b, inst.to_lists(one_based=True)
+
+    start, cpu = time.time(), time.process_time()
+    lb    = lower_bound(inst)
+    state = island_alns(N, M, b, L, islands=islands, max_iter=max_iter, seed=seed,
+                        lb=lb, time_limit=time_limit)
+    runtime = int((time.time() - start) * 1000)
+    cpu_ms  = int((time.process_time() - cpu) * 1000)
+
+    max_load = state.max
+    status   = "OPTIMAL" if max_load <= lb else "FEASIBLE"
+    write_result(out_path, N, M, max_load, runtime, status)
+    record(out_path, "ALNS", in_path, inst, max_load, status, runtime, cpu_ms,
+           seed=seed, params={"max_iter": max_iter, "time_limit": time_limit, "islands": islands})
+
+def solve_stdin(seed=42, islands=1, **opts):
+    """
+    Chế độ chấm bài: đọc instance từ stdin, in N rồi mỗi dòng "b r1 … rb"
+    (reviewer 1-based) ra stdout.
+    """
+    inst = read_stdin()
+    N, M, b, L = inst.N, inst.M, inst.b, inst.to_lists(one_based=True)
+    state = island_alns(N, M, b, L, islands=islands, seed=seed, lb=lower_bound(inst), **opts)
+    out = [str(N)]
+    out += [" ".join(map(str, [b, *reviewers])) for reviewers in state.sol]
+    sys.stdout.write("\n".join(out) + "\n")
+
 # ---------- batch runner -------------------------------------------
 def main():
+    ap = argparse.ArgumentParser(description="ALNS trên mọi instance trong instances/")
+    ap.add_argument("--islands", type=int, default=1,
+                    help="số đảo ALNS chạy song song (0 = số CPU)")
+    ap.add_argument("--time-limit", type=float, default=10.0)
+    ap.add_argument("--max-iter", type=int, default=None)
+    ap.add_argument("--objective", choices=list(OBJECTIVES), default="fitness")
+    ap.add_argument("--accept", choices=list(ACCEPT), default="improve")
+    ap.add_argument("--stdin", action="store_true",
+                    help="đọc một instance từ stdin và in phân công ra stdout")
+    args = ap.parse_args()
+    islands = args.islands or os.cpu_count() or 1
+
+    if args.stdin:
+        solve_stdin(islands=islands, max_iter=args.max_iter, time_limit=args.time_limit,
+                    objective=args.objective, accept=args.accept)
+        return
+
     root = os.getcwd()
     inst_dir = os.path.join(root, "instances")
     res_dir  = os.path.join(root, "results")
@@ -138,14 +550,8 @@ def main():
         out_path = os.path.join(res_dir, out_name)
 
         print(f"Đang xử lý: {fname} → {out_name}")
-        N, M, b, L = read_instance(in_path)
-
-        start = time.time()
-        loads = alns(N, M, b, L, max_iter=1000, seed=42)
-        runtime = int((time.time() - start) * 1000)
-
-        max_load = max(loads.values()) if loads else 0
-        write_result(out_path, N, M, max_load, runtime)
+        run_instance(in_path, out_path, seed=42, max_iter=args.max_iter,
+                     time_limit=args.time_limit, islands=islands)
 
 if __name__ == "__main__":
     main()
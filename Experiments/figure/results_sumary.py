@@ -1,63 +1,68 @@
 import csv
-import re
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+import results_store
+
 # -------- cấu hình --------
 RESULTS_DIR = Path("results")
+STORE       = RESULTS_DIR / results_store.STORE_NAME
+DB          = RESULTS_DIR / results_store.DB_NAME
 OUT_CSV     = Path("summary.csv")
 
-FILE_RE  = re.compile(r"\[(.*?)\]\s*(.*?)\.txt$", re.I)        # [+method+] sample.txt
-OBJ_RE   = re.compile(r"Objective Value:\s*([+-]?\d+(?:\.\d+)?)\s+(\w+)", re.I)
-TIME_RE  = re.compile(r"(\d+)\s*ms", re.I)
-N_RE     = re.compile(r"n\s*=\s*(\d+)", re.I)
-M_RE     = re.compile(r"m\s*=\s*(\d+)", re.I)
-NAME_NM  = re.compile(r"_(\d+?)_(\d+?)_")                      # fallback lấy n,m từ tên
-
-rows, methods = {}, set()
+rows, methods, timed, seeded, added = {}, set(), set(), set(), 0
+runs = []
+if RESULTS_DIR.is_dir():
+    con = results_store.connect(str(DB))
+    if STORE.exists():
+        added = results_store.ingest(con, str(STORE))      # chỉ đọc các dòng mới
+    # file kết quả văn bản chưa có trong store (file cũ, chạy ngoài store) được nạp từng file
+    if results_store.import_text_results(con, str(RESULTS_DIR), str(STORE)):
+        added += results_store.ingest(con, str(STORE))
+    runs = results_store.latest_runs(con)
 
-for path in RESULTS_DIR.glob("*.txt"):
-    m = FILE_RE.match(path.name)
-    if not m:
-        continue
-    method, sample = m.groups()
-    methods.add(method)
+# mỗi (instance, method) có một lần chạy mới nhất cho từng seed
+groups = {}
+for r in runs:
+    groups.setdefault((r["instance"], r["method"]), []).append(r)
 
-    with path.open(encoding="utf-8", errors="ignore") as f:
-        txt = f.read()
 
-    # n, m
-    n = int(N_RE.search(txt).group(1)) if N_RE.search(txt) else None
-    mval = int(M_RE.search(txt).group(1)) if M_RE.search(txt) else None
-    if n is None or mval is None:
-        nm = NAME_NM.search(sample)
-        if nm:
-            n, mval = map(int, nm.groups())
+def mean(values):
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 2) if values else None
 
-    # objective & status
-    obj_match = OBJ_RE.search(txt)
-    obj_val, is_opt = (None, None)
-    if obj_match:
-        obj_val = obj_match.group(1)
-        is_opt  = obj_match.group(2).upper() == "OPTIMAL"
 
-    # time
-    t_match = TIME_RE.search(txt)
-    t_ms = int(t_match.group(1)) if t_match else None
+def number(x):
+    return int(x) if x is not None and x == int(x) else x
 
-    # khởi tạo hàng nếu cần
-    row = rows.setdefault(sample, {"sample": sample, "n": n, "m": mval})
-    # đảm bảo ba trường cho mọi method
-    for key in ("objective", "time_ms", "optimal"):
-        row.setdefault(f"{method}_{key}", None)
 
-    row[f"{method}_objective"] = obj_val
-    row[f"{method}_time_ms"]   = t_ms
-    row[f"{method}_optimal"]   = is_opt
+for (sample, method), rs in groups.items():
+    methods.add(method)
+    objs = [r["objective"] for r in rs if r["objective"] is not None]
+    row  = rows.setdefault(sample, {"sample": sample, "n": rs[0]["n"], "m": rs[0]["m"]})
+    # nhiều seed: objective tốt nhất, kèm trung bình và số seed; thời gian lấy trung bình
+    row[f"{method}_objective"] = number(min(objs)) if objs else None
+    row[f"{method}_time_ms"]   = number(mean(r["wall_ms"] for r in rs))
+    row[f"{method}_optimal"]   = any(r["status"] == "OPTIMAL" for r in rs) \
+        if any(r["status"] for r in rs) else None
+    if len(rs) > 1:
+        seeded.add(method)
+        row[f"{method}_objective_mean"] = number(mean(objs))
+        row[f"{method}_seeds"]          = len(rs)
+    if any(r["build_ms"] is not None for r in rs):   # phương pháp đo riêng dựng / giải mô hình
+        timed.add(method)
+        row[f"{method}_build_ms"] = number(mean(r["build_ms"] for r in rs))
+        row[f"{method}_solve_ms"] = number(mean(r["solve_ms"] for r in rs))
 
 # -------- ghi CSV --------
 fieldnames = ["sample", "n", "m"]
 for method in sorted(methods):
     fieldnames += [f"{method}_objective", f"{method}_time_ms", f"{method}_optimal"]
+    if method in seeded:
+        fieldnames += [f"{method}_objective_mean", f"{method}_seeds"]
+    if method in timed:
+        fieldnames += [f"{method}_build_ms", f"{method}_solve_ms"]
 
 with OUT_CSV.open("w", newline="", encoding="utf-8") as f:
     writer = csv.DictWriter(f, fieldnames=fieldnames)
@@ -65,4 +70,4 @@ with OUT_CSV.open("w", newline="", encoding="utf-8") as f:
     for sample in sorted(rows):
         writer.writerow(rows[sample])
 
-print(f"✅  Đã ghi {len(rows)} mẫu, {len(methods)} phương pháp → {OUT_CSV}")
+print(f"✅  Nạp {added} bản ghi mới; đã ghi {len(rows)} mẫu, {len(methods)} phương pháp → {OUT_CSV}")
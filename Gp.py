@@ -1,18 +1,16 @@
 from __future__ import annotations
-import os, time, copy, math, random
+import os, time, math, json, random, argparse
+import multiprocessing as mp
+from collections import OrderedDict
 from typing import Any, List, Tuple
+from instance import load_instance
+from bounds import lower_bound
+from results_store import record, instance_hash
 
 
 def read_instance(path: str) -> Tuple[int, int, int, List[List[int]]]:
-    with open(path, "r", encoding="utf-8") as f:
-        tok = [int(x) for line in f for x in line.strip().split()]
-    N, M, b = tok[:3]
-    idx, L = 3, []
-    for _ in range(N):
-        k = tok[idx]; idx += 1
-        revs = tok[idx:idx + k]; idx += k
-        L.append([r - 1 for r in revs])           
-    return N, M, b, L
+    inst = load_instance(path)
+    return inst.N, inst.M, inst.b, inst.to_lists()
 
 
 OPS = {
@@ -24,8 +22,186 @@ OPS = {
     'max': lambda a, b: a if a > b else b,
 }
 OP_NAMES   = list(OPS.keys())
+COMMUTATIVE = {'add', 'mul', 'min', 'max'}
 TERM_NAMES = ['load', 'slack', 'deg', 'candCnt', 'rand', 'const']
 MAX_DEPTH  = 4
+# chống phình cây: con vượt giới hạn sau lai ghép/đột biến bị thay bằng cha
+MAX_TREE_DEPTH = 8
+MAX_TREE_SIZE  = 63
+
+# mã Python tương ứng mỗi nút, dùng khi dịch cây thành hàm (xem compile_tree)
+OP_SRC = {
+    'add': '({} + {})',
+    'sub': '({} - {})',
+    'mul': '({} * {})',
+    'div': '_div({}, {})',
+    'min': '_min({}, {})',
+    'max': '_max({}, {})',
+}
+TERM_SRC = {
+    'load':    'load[r]',
+    'slack':   '(Q - load[r])',
+    'deg':     'deg[r]',
+    'candCnt': 'cnt',
+    'rand':    '_rand()',
+}
+
+
+def tree_src(node: Any) -> str:
+    if node[0] == 'op':
+        _, name, lft, rgt = node
+        return OP_SRC[name].format(tree_src(lft), tree_src(rgt))
+    _, name, val = node
+    return f'({val!r})' if name == 'const' else TERM_SRC[name]
+
+
+def has_rand(node: Any) -> bool:
+    if node[0] == 'op':
+        return has_rand(node[2]) or has_rand(node[3])
+    return node[1] == 'rand'
+
+
+def tree_shape(node: Any) -> Tuple[int, int]:
+    """(độ sâu, số nút); lá có độ sâu 0 như trong gen_full_tree."""
+    if node[0] == 'term':
+        return 0, 1
+    dl, sl = tree_shape(node[2])
+    dr, sr = tree_shape(node[3])
+    return 1 + max(dl, dr), 1 + sl + sr
+
+
+def simplify(node: Any) -> Any:
+    """
+    Dạng chuẩn của cây: gộp hằng (op của hai 'const' → một 'const' cùng
+    giá trị) và xếp hai con của toán tử giao hoán theo repr, để các cây
+    tương đương về cấu trúc có cùng khoá trong cache fitness.
+    """
+    if node[0] == 'term':
+        return node
+    _, name, lft, rgt = node
+    lft, rgt = simplify(lft), simplify(rgt)
+    if lft[0] == 'term' and lft[1] == 'const' and rgt[0] == 'term' and rgt[1] == 'const':
+        return ('term', 'const', OPS[name](lft[2], rgt[2]))
+    if name in COMMUTATIVE and repr(rgt) < repr(lft):
+        lft, rgt = rgt, lft
+    return ('op', name, lft, rgt)
+
+
+class Evaluator:
+    """
+    Dữ liệu chỉ đọc của một instance (L, bậc reviewer, quota) cùng hàm chấm
+    một cây. Mỗi tiến trình worker dựng đúng một Evaluator lúc khởi động.
+    """
+
+    def __init__(self, N: int, M: int, B: int, L: List[List[int]]):
+        self.N, self.M, self.B, self.L = N, M, B, L
+        self.quota = math.ceil(N * B / M)
+        self.deg   = [0] * M
+        for i in range(N):
+            for r in L[i]:
+                self.deg[r] += 1
+        self.namespace = {'deg': self.deg, 'Q': self.quota,
+                          '_div': OPS['div'], '_min': OPS['min'], '_max': OPS['max']}
+
+    def eval_tree(self, node: Any, r: int, i: int, loads: List[int], rand):
+        t = node[0]
+        if t == 'op':
+            _, name, lft, rgt = node
+            return OPS[name](self.eval_tree(lft, r, i, loads, rand),
+                             self.eval_tree(rgt, r, i, loads, rand))
+        _, name, val = node
+        if name == 'load':    return loads[int(abs(r)) % self.M]
+        if name == 'slack':   return self.quota - loads[int(abs(r)) % self.M]
+        if name == 'deg':     return self.deg[int(abs(r)) % self.M]
+        if name == 'candCnt': return len(self.L[int(abs(i)) % self.N])
+        if name == 'rand':    return rand()
+        if name == 'const':   return val
+        raise ValueError
+
+    def compile_tree(self, tree):
+        """
+        Dịch cây một lần thành hàm score(cand, load, cnt, i, _rand) trả về
+        [(điểm, r)] cho mọi ứng viên của một paper, tính trái trước phải như
+        eval_tree. Cây quá sâu để compile thì quay về eval_tree.
+        """
+        try:
+            src = f'lambda cand, load, cnt, i, _rand: [({tree_src(tree)}, r) for r in cand]'
+            return eval(compile(src, '<gp-tree>', 'eval'), self.namespace)
+        except (RecursionError, SyntaxError, MemoryError):
+            def score(cand, load, cnt, i, rand):
+                return [(self.eval_tree(tree, r, i, load, rand), r) for r in cand]
+            return score
+
+    def build_assignment(self, tree, rng_seed=None, bound=None, stop=None, out=None):
+        """
+        (tải lớn nhất, số slot thiếu, bị loại?) của phân công tham lam theo cây
+        trên `stop` paper đầu (mặc định cả N). 'rand' rút từ
+        random.Random(rng_seed) riêng của cá thể, nên kết quả không phụ thuộc
+        vào việc cây được chấm ở tiến trình nào, và chấm lại một tiền tố cho
+        đúng cùng kết quả.
+
+        Paper được gán lần lượt và tải chỉ tăng, nên (max, viol) sau mỗi tiền
+        tố là cận dưới của fitness cuối. Vượt `bound` là dừng ngay và trả về
+        cận dưới đó với cờ True. Nếu có `out`, danh sách reviewer của từng
+        paper được nối vào đó.
+        """
+        B, L = self.B, self.L
+        N = self.N if stop is None else stop
+        score  = self.compile_tree(tree)
+        redraw = has_rand(tree)
+        rand   = random.Random(rng_seed).random if redraw else None
+        loads  = [0] * self.M
+        mark   = [-1] * self.M              # mark[r] == i: r đã được chọn cho paper i
+        viol   = top = 0
+        bmax, bviol = bound if bound is not None else (math.inf, 0)
+        for i in range(N):
+            Li  = L[i]
+            cnt = len(Li)
+            if redraw:
+                # 'rand' rút lại ở mỗi slot nên chấm lại các ứng viên còn lại
+                for _ in range(B):
+                    scored = score([r for r in Li if mark[r] != i], loads, cnt, i, rand)
+                    if not scored:
+                        viol += 1
+                        break
+                    _, best = min(scored)
+                    mark[best] = i
+                    l = loads[best] = loads[best] + 1
+                    if l > top:
+                        top = l
+            else:
+                # điểm các ứng viên còn lại không đổi giữa các slot (chỉ tải của
+                # reviewer vừa chọn tăng) → chấm một lần, lấy b reviewer nhỏ nhất
+                need = B
+                for _, r in sorted(score(Li, loads, cnt, i, rand)):
+                    if mark[r] == i:
+                        continue
+                    mark[r] = i
+                    l = loads[r] = loads[r] + 1
+                    if l > top:
+                        top = l
+                    need -= 1
+                    if not need:
+                        break
+                if need:
+                    viol += 1
+            if out is not None:
+                out.append([r for r in Li if mark[r] == i])
+            if top > bmax or (top == bmax and viol > bviol):
+                return top, viol, True
+        return top, viol, False
+
+
+_EVALUATOR: Evaluator | None = None
+
+
+def _init_worker(N: int, M: int, B: int, L: List[List[int]]):
+    global _EVALUATOR
+    _EVALUATOR = Evaluator(N, M, B, L)
+
+
+def _evaluate(job: Tuple[Any, str | None, Tuple[int, int] | None, int | None]) -> Tuple[int, int, bool]:
+    return _EVALUATOR.build_assignment(*job)
 
 
 def run_gp(N: int, M: int, B: int, L: List[List[int]],
@@ -34,39 +210,20 @@ def run_gp(N: int, M: int, B: int, L: List[List[int]],
            max_generations=40,
            seed=42,
            bad_init=False,
-           time_limit_s: float | None = None) -> Tuple[int, int]:
+           time_limit_s: float | None = None,
+           lb: int = 0,
+           cache_size: int = 10_000,
+           workers: int | None = None,
+           race_quantile: float | None = 0.5,
+           race_prefix: float = 0.125,
+           race_keep: float = 0.25) -> Tuple[Any, Tuple[int, int]]:
+    """Tiến hoá quần thể cây; trả về (cây tốt nhất, (tải lớn nhất, số vi phạm))."""
 
     random.seed(seed)
     start_time = time.time()
 
-    global GLOBAL_QUOTA, REVIEWER_DEG
-    GLOBAL_QUOTA = math.ceil(N * B / M)
-    REVIEWER_DEG = [0] * M
-    for i in range(N):
-        for r in L[i]:
-            REVIEWER_DEG[r] += 1
-
-
-    def rev_idx(x): return int(abs(x)) % M
-    def pap_idx(x): return int(abs(x)) % N
     def rand_const(): return random.uniform(-2, 2)
 
-    def eval_tree(node: Any, r: int, i: int, loads: List[int]):
-        t = node[0]
-        if t == 'op':
-            _, name, lft, rgt = node
-            return OPS[name](eval_tree(lft, r, i, loads),
-                             eval_tree(rgt, r, i, loads))
-        _, name, val = node
-        if name == 'load':    return loads[rev_idx(r)]
-        if name == 'slack':   return GLOBAL_QUOTA - loads[rev_idx(r)]
-        if name == 'deg':     return REVIEWER_DEG[rev_idx(r)]
-        if name == 'candCnt': return len(L[pap_idx(i)])
-        if name == 'rand':    return random.random()
-        if name == 'const':   return val
-        raise ValueError
-
-
     def gen_full_tree(d):
         if d == 0:
             t = random.choice(TERM_NAMES)
@@ -94,26 +251,105 @@ def run_gp(N: int, M: int, B: int, L: List[List[int]],
 
     def crossover(a, b):
         if a[0] == 'term' or b[0] == 'term':
-            return copy.deepcopy(b)
+            return b                        # cây là tuple bất biến: dùng chung cây con
         if random.random() < .5:
             return ('op', a[1], crossover(a[2], b[2]), a[3])
         return ('op', a[1], a[2], crossover(a[3], b[3]))
 
-    def build_assignment(tree):
-        loads = [0] * M
-        viol  = 0
-        for i in range(N):
-            chosen = []
-            for _ in range(B):
-                cand = [r for r in L[i] if r not in chosen]
-                if not cand:
-                    viol += 1
-                    break
-                _, best = min((eval_tree(tree, r, i, loads), r) for r in cand)
-                chosen.append(best)
-                loads[best] += 1
-        return max(loads), viol
-
+    # Chấm quần thể trên một pool tiến trình (workers=None: số CPU). Worker
+    # nhận (L, N, M, B) một lần khi khởi động và chỉ nhận cây qua pickle; cây
+    # có 'rand' dùng seed riêng "seed:gen:idx" nên kết quả giống hệt nhau với
+    # mọi số worker.
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and mp.current_process().daemon:
+        workers = 1                         # tiến trình daemon không tạo được pool
+    if workers > 1:
+        pool = mp.Pool(workers, initializer=_init_worker, initargs=(N, M, B, L))
+        evaluate_all = lambda jobs: pool.map(_evaluate, jobs,
+                                             chunksize=max(1, len(jobs) // (4 * workers)))
+    else:
+        pool = None
+        evaluator = Evaluator(N, M, B, L)
+        evaluate_all = lambda jobs: [evaluator.build_assignment(*job) for job in jobs]
+
+    # dạng chuẩn → (max, viol, bị loại?), LRU; mục bị loại giữ cận dưới,
+    # dùng lại được khi ngưỡng đua mới vẫn thấp hơn nó
+    cache: OrderedDict = OrderedDict()
+    n_prefix = max(1, int(N * race_prefix))
+
+    def evaluate_pop(pop, gen, bound=None):
+        """
+        Cây có 'rand' luôn được chấm lại; cây tất định chỉ chấm một lần
+        (trên dạng chuẩn, đã gộp hằng) rồi lấy từ cache.
+
+        Có `bound` thì đua hai vòng: mọi cá thể chạy trên n_prefix paper đầu,
+        chỉ race_keep phần tốt nhất được chấm trên cả N paper; cả hai vòng đều
+        dừng ngay khi chắc chắn tệ hơn `bound`. Cá thể bị loại ở vòng đầu
+        nhận fitness ngoại suy từ tiền tố, luôn tệ hơn `bound`.
+        """
+        fit, jobs, owner, keys, pending = [None] * len(pop), [], {}, [], {}
+        for j, tree in enumerate(pop):
+            key = simplify(tree)
+            if has_rand(key):
+                owner[len(jobs)] = [j]
+                jobs.append((key, f"{seed}:{gen}:{j}", bound))
+                keys.append(None)
+                continue
+            hit = cache.get(key)
+            if hit is not None and (not hit[2] or (bound is not None and hit[:2] > bound)):
+                cache.move_to_end(key)
+                fit[j] = hit[:2]
+                continue
+            if key in pending:
+                owner[pending[key]].append(j)
+                continue
+            pending[key] = len(jobs)
+            owner[len(jobs)] = [j]
+            jobs.append((key, None, bound))
+            keys.append(key)
+
+        def finish(k, res):
+            for j in owner[k]:
+                fit[j] = res[:2]
+            if keys[k] is not None:
+                cache[keys[k]] = res
+                cache.move_to_end(keys[k])
+
+        alive = list(range(len(jobs)))
+        if bound is not None and n_prefix < N and len(jobs) > 1:
+            heads = evaluate_all([job + (n_prefix,) for job in jobs])
+            alive = []
+            for k, res in enumerate(heads):
+                if res[2]:
+                    finish(k, res)          # đã chắc chắn tệ hơn bound
+                else:
+                    alive.append(k)
+            alive.sort(key=lambda k: heads[k][:2])
+            n_keep = math.ceil(race_keep * len(alive))
+            scale  = N / n_prefix
+            for k in alive[n_keep:]:
+                est = (max(math.ceil(heads[k][0] * scale), bound[0] + 1),
+                       math.ceil(heads[k][1] * scale))
+                for j in owner[k]:
+                    fit[j] = est
+            alive = alive[:n_keep]
+        results = evaluate_all([jobs[k] + (None,) for k in alive]) if alive else []
+        for k, res in zip(alive, results):
+            finish(k, res)
+        while len(cache) > cache_size:
+            cache.popitem(last=False)
+        return fit
+
+    def race_bound(fit):
+        """
+        Ngưỡng đua cho thế hệ sau: phân vị race_quantile của fitness thế hệ
+        này, không thấp hơn best. Cá thể bị loại chỉ thắng tournament khi cả 5
+        đối thủ cũng bị loại, và không bao giờ thành best.
+        """
+        if race_quantile is None:
+            return None
+        q = sorted(fit)[int(race_quantile * (len(fit) - 1))]
+        return max(q, best[1])
 
     if bad_init:
         pop = [gen_bad_tree() for _ in range(pop_size)]
@@ -128,7 +364,7 @@ def run_gp(N: int, M: int, B: int, L: List[List[int]],
             d = random.choice(tuple(depths))
             pop.append(gen_grow_tree(d))
 
-    fit  = [build_assignment(t) for t in pop]
+    fit  = evaluate_pop(pop, 0)
     best = min(zip(pop, fit), key=lambda x: x[1])
     TOUR, CXPB, MUTPB = 5, .9, .1
 
@@ -137,37 +373,142 @@ def run_gp(N: int, M: int, B: int, L: List[List[int]],
     while gen < max_generations:
         if time_limit_s and (time.time() - start_time) >= time_limit_s:
             break
+        if best[1][1] == 0 and best[1][0] <= lb:      # đã chạm cận dưới
+            break
         gen += 1
 
 
         def select():
             idxs = random.sample(range(pop_size), TOUR)
-            return copy.deepcopy(min(idxs, key=lambda j: fit[j]) and pop[min(idxs, key=lambda j: fit[j])])
+            return pop[min(idxs, key=lambda j: fit[j])]
         new_pop = []
         while len(new_pop) < pop_size:
             p1, p2 = select(), select()
-            child  = crossover(p1, p2) if random.random() < CXPB else copy.deepcopy(p1)
+            child  = crossover(p1, p2) if random.random() < CXPB else p1
             if random.random() < MUTPB:
                 child = mutate(child)
+            depth, size = tree_shape(child)
+            if depth > MAX_TREE_DEPTH or size > MAX_TREE_SIZE:
+                child = p1
             new_pop.append(child)
         pop  = new_pop
-        fit  = [build_assignment(t) for t in pop]
+        fit  = evaluate_pop(pop, gen, race_bound(fit))
         cand = min(zip(pop, fit), key=lambda x: x[1])
         if cand[1] < best[1]:
-            best = (copy.deepcopy(cand[0]), cand[1])
+            best = cand
 
-    return best[1]   
+    if pool is not None:
+        pool.terminate()
+    return best
 
-def write_result(path, n, m, obj, runtime_ms):
+def write_result(path, n, m, obj, runtime_ms, status="FEASIBLE"):
     with open(path, "w") as f:
         f.write(f"{os.path.basename(path)}\n")
         f.write(f"n = {n}\n")
         f.write(f"m = {m}\n")
-        f.write(f"Objective Value: {obj}\n")
+        f.write(f"Objective Value: {obj} {status}\n")
         f.write(f"{runtime_ms} ms\n")
 
 
+# ---------- policy: cây đã tiến hoá, dùng lại như một heuristic greedy ----
+def save_policy(path: str, tree: Any, trained_on: List[dict]):
+    """Ghi cây (JSON, tuple → list) cùng danh sách instance đã dùng để huấn luyện."""
+    with open(path, "w") as f:
+        json.dump({"tree": tree, "trained_on": trained_on}, f)
+
+
+def load_policy(path: str) -> Tuple[Any, List[dict]]:
+    def as_tuple(node):
+        if node[0] == 'op':
+            return ('op', node[1], as_tuple(node[2]), as_tuple(node[3]))
+        return tuple(node)
+    with open(path) as f:
+        data = json.load(f)
+    return as_tuple(data["tree"]), data["trained_on"]
+
+
+def apply_policy(tree: Any, inst, seed=42) -> Tuple[int, int, List[List[int]]]:
+    """Một lượt greedy theo cây đã compile: (tải lớn nhất, số vi phạm, phân công)."""
+    assign: List[List[int]] = []
+    evaluator = Evaluator(inst.N, inst.M, inst.b, inst.to_lists())
+    max_load, viol, _ = evaluator.build_assignment(simplify(tree), f"{seed}", out=assign)
+    return max_load, viol, assign
+
+
+def run_instance(in_path, out_path, seed=42, time_limit_s=600, policy_out=None):
+    inst = load_instance(in_path)
+    N, M, B, L = inst.N, inst.M, inst.b, inst.to_lists()
+
+    start, cpu = time.time(), time.process_time()
+    lb = lower_bound(inst)
+    tree, (max_load, viol) = run_gp(N, M, B, L,
+                                    seed=seed,
+                                    time_limit_s=time_limit_s,
+                                    lb=lb)
+    runtime_ms = int((time.time() - start) * 1000)
+    cpu_ms     = int((time.process_time() - cpu) * 1000)
+
+    status = "OPTIMAL" if viol == 0 and max_load <= lb else "FEASIBLE"
+    write_result(out_path, N, M, max_load, runtime_ms, status)
+    record(out_path, "GP", in_path, inst, max_load, status, runtime_ms, cpu_ms,
+           seed=seed, params={"time_limit_s": time_limit_s}, violations=viol)
+    if policy_out:
+        save_policy(policy_out, tree, [{
+            "instance":   os.path.basename(in_path),
+            "inst_hash":  instance_hash(in_path),
+            "n": N, "m": M, "b": B,
+            "seed":       seed,
+            "objective":  max_load,
+            "violations": viol,
+        }])
+
+
+def run_policy(policy_path, in_path, out_path, seed=42, store_assignment=False):
+    inst = load_instance(in_path)
+    tree, _ = load_policy(policy_path)
+
+    start, cpu = time.time(), time.process_time()
+    max_load, viol, assign = apply_policy(tree, inst, seed=seed)
+    runtime_ms = int((time.time() - start) * 1000)
+    cpu_ms     = int((time.process_time() - cpu) * 1000)
+
+    lb = lower_bound(inst)
+    status = "OPTIMAL" if viol == 0 and max_load <= lb else "FEASIBLE"
+    write_result(out_path, inst.N, inst.M, max_load, runtime_ms, status)
+    record(out_path, "GP_policy", in_path, inst, max_load, status, runtime_ms, cpu_ms,
+           seed=seed, params={"policy": os.path.basename(policy_path)}, violations=viol,
+           assignment=assign if store_assignment else None)
+
+
 def main():
+    ap  = argparse.ArgumentParser(description="GP: tiến hoá heuristic phân công hoặc áp dụng policy đã lưu")
+    sub = ap.add_subparsers(dest="cmd")
+    tr  = sub.add_parser("train", help="tiến hoá trên một instance và lưu cây tốt nhất")
+    tr.add_argument("instance")
+    tr.add_argument("--policy", required=True, help="file JSON ghi policy")
+    tr.add_argument("--seed", type=int, default=42)
+    tr.add_argument("--time-limit", type=float, default=600)
+    tr.add_argument("--results", default="results")
+    ap_ = sub.add_parser("apply", help="chạy policy đã lưu như một greedy trên các instance")
+    ap_.add_argument("policy")
+    ap_.add_argument("instances", nargs="+")
+    ap_.add_argument("--results", default="results")
+    args = ap.parse_args()
+
+    if args.cmd == "train":
+        os.makedirs(args.results, exist_ok=True)
+        out_path = os.path.join(args.results, f"[GP] {os.path.basename(args.instance)}")
+        run_instance(args.instance, out_path, seed=args.seed,
+                     time_limit_s=args.time_limit, policy_out=args.policy)
+        return
+    if args.cmd == "apply":
+        os.makedirs(args.results, exist_ok=True)
+        for in_path in args.instances:
+            out_path = os.path.join(args.results, f"[GP_policy] {os.path.basename(in_path)}")
+            run_policy(args.policy, in_path, out_path)
+            print(f"{os.path.basename(in_path)} → {out_path}")
+        return
+
     root      = os.getcwd()
     inst_dir  = os.path.join(root, "instances")
     res_dir   = os.path.join(root, "results")
@@ -181,15 +522,7 @@ def main():
         out_path = os.path.join(res_dir, out_name)
 
         print(f"Đang xử lý: {fname} → {out_name}")
-        N, M, B, L = read_instance(in_path)
-
-        start = time.time()
-        max_load, _ = run_gp(N, M, B, L,
-                             seed=42,
-                             time_limit_s=600)       
-        runtime_ms = int((time.time() - start) * 1000)
-
-        write_result(out_path, N, M, max_load, runtime_ms)
+        run_instance(in_path, out_path, seed=42, time_limit_s=600)
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,16 @@
 
 import os, time, random
-from collections import defaultdict
 from typing import List, Dict, Tuple
+from instance import load_instance
+from bounds import lower_bound
+from results_store import record
 
 class LocalSearch:
-    def __init__(self, N: int, M: int, b: int):
+    def __init__(self, N: int, M: int, b: int, lb: int = 0):
         self.N = N
         self.M = M
         self.b = b
-
-    def get_load(self, sol) -> defaultdict:
-        loads = defaultdict(int)
-        for r_id in range(1, self.M + 1):
-            loads[r_id] = 0
-        for p_assign in sol:
-            for rev_id in p_assign:
-                loads[rev_id] += 1
-        return loads
+        self.lb = lb          # cận dưới: chạm tới thì dừng vì đã tối ưu
 
     def solve(self, L: Dict[int, List[int]]) -> Tuple[List[List[int]], List[int]]:
         # Khởi tạo ngẫu nhiên
@@ -27,28 +21,32 @@ class LocalSearch:
                 raise ValueError(f"Not enough reviewers for paper {p_idx + 1}")
             cur_sol.append(random.sample(avail_revs, self.b))
 
-        # Local search hill-climbing
-        while True:
-            found = False
-            cur_loads = self.get_load(cur_sol)
-            if not cur_loads:
-                break
-            cur_max = max(cur_loads.values())
-            search = max(cur_loads, key=cur_loads.get)          # reviewer nặng nhất
-
-            # các paper mà reviewer này đang chấm
-            search_papers = [i for i, assign in enumerate(cur_sol) if search in assign]
-
-            for p_idx in search_papers:
-                p_assigned = set(cur_sol[p_idx])
-                p_eligible = set(L[p_idx + 1])
-                new_revs   = p_eligible - p_assigned
+        # Các cấu trúc được cập nhật tại chỗ sau mỗi bước:
+        #   load[r]     : tải của reviewer r (1-based, load[0] bỏ trống)
+        #   papers[r]   : tập paper (0-based) đang gán cho r
+        #   bucket[c]   : tập reviewer có tải đúng bằng c
+        load   = [0] * (self.M + 1)
+        papers = [set() for _ in range(self.M + 1)]
+        for p_idx, assign in enumerate(cur_sol):
+            for rev_id in assign:
+                load[rev_id] += 1
+                papers[rev_id].add(p_idx)
+        cur_max = max(load[1:], default=0)
+        bucket  = [set() for _ in range(cur_max + 1)]
+        for r_id in range(1, self.M + 1):
+            bucket[load[r_id]].add(r_id)
 
+        # Local search hill-climbing. Mỗi bước chỉ chuyển một lượt chấm từ
+        # reviewer nặng nhất sang reviewer có tải < cur_max - 1, nên tải tối đa
+        # không bao giờ tăng và con trỏ cur_max chỉ đi xuống.
+        while cur_max > self.lb:
+            search = next(iter(bucket[cur_max]))           # reviewer nặng nhất
+            found = False
+            for p_idx in papers[search]:
+                assign = cur_sol[p_idx]
                 # thử thay thế reviewer nặng bằng reviewer nhẹ
-                for replace in new_revs:
-                    if cur_loads.get(replace, 0) < cur_max - 1:
-                        cur_sol[p_idx].remove(search)
-                        cur_sol[p_idx].append(replace)
+                for replace in L[p_idx + 1]:
+                    if load[replace] < cur_max - 1 and replace not in assign:
                         found = True
                         break
                 if found:
@@ -56,8 +54,19 @@ class LocalSearch:
             if not found:
                 break
 
-        final_loads = list(self.get_load(cur_sol).values())
-        return cur_sol, final_loads  # list[int]
+            assign[assign.index(search)] = replace
+            papers[search].remove(p_idx)
+            papers[replace].add(p_idx)
+            bucket[cur_max].remove(search)
+            bucket[cur_max - 1].add(search)
+            bucket[load[replace]].remove(replace)
+            bucket[load[replace] + 1].add(replace)
+            load[search]  -= 1
+            load[replace] += 1
+            while cur_max > 0 and not bucket[cur_max]:
+                cur_max -= 1
+
+        return cur_sol, load[1:]  # list[int]
 
 # ────────────────────────────────────────────────────────────────
 #  I/O helpers
@@ -69,29 +78,44 @@ def read_instance(path: str) -> Tuple[int, int, int, Dict[int, List[int]]]:
     k reviewer1 reviewer2 ...
     (reviewer đánh số 1-based)
     """
-    with open(path, "r", encoding="utf-8") as f:
-        n, m, b = map(int, f.readline().split())
-        L: Dict[int, List[int]] = {}
-        for p in range(1, n + 1):
-            parts = list(map(int, f.readline().split()))
-            k, reviewers = parts[0], parts[1:]
-            assert len(reviewers) == k
-            L[p] = reviewers
-    return n, m, b, L
-
-def write_result(out_path: str, n: int, m: int, obj: int, runtime_ms: int):
+    inst = load_instance(path)
+    L: Dict[int, List[int]] = dict(enumerate(inst.to_lists(one_based=True), start=1))
+    return inst.N, inst.M, inst.b, L
+
+def write_result(out_path: str, n: int, m: int, obj: int, runtime_ms: int,
+                 status: str = "FEASIBLE"):
     with open(out_path, "w") as f:
         f.write(f"{os.path.basename(out_path)}\n")
         f.write(f"n = {n}\n")
         f.write(f"m = {m}\n")
-        f.write(f"Objective Value: {obj} FEASIBLE\n")
+        f.write(f"Objective Value: {obj} {status}\n")
         f.write(f"{runtime_ms} ms\n")
 
+def run_instance(in_path: str, out_path: str, seed: int = 42,
+                 store_assignment: bool = False):
+    random.seed(seed)                     # tái lập kết quả
+    inst = load_instance(in_path)
+    n, m, b = inst.N, inst.M, inst.b
+    L = dict(enumerate(inst.to_lists(one_based=True), start=1))
+
+    start, cpu = time.time(), time.process_time()
+    lb = lower_bound(inst)
+    sol, loads = LocalSearch(n, m, b, lb).solve(L)
+    runtime_ms = int((time.time() - start) * 1000)
+    cpu_ms     = int((time.process_time() - cpu) * 1000)
+
+    max_load = max(loads) if loads else 0
+    status   = "OPTIMAL" if max_load <= lb else "FEASIBLE"
+    write_result(out_path, n, m, max_load, runtime_ms, status)
+    record(out_path, "LocalSearch", in_path, inst, max_load, status, runtime_ms, cpu_ms,
+           seed=seed,
+           # store lưu reviewer 0-based như Instance; LocalSearch dùng 1-based
+           assignment=[[r - 1 for r in row] for row in sol] if store_assignment else None)
+
 # ────────────────────────────────────────────────────────────────
 #  Batch runner
 # ────────────────────────────────────────────────────────────────
 def main():
-    random.seed(42)                       # tái lập kết quả
     root      = os.getcwd()
     inst_dir  = os.path.join(root, "instances")
     res_dir   = os.path.join(root, "results")
@@ -105,14 +129,7 @@ def main():
         out_path = os.path.join(res_dir, out_name)
 
         print(f"Đang xử lý: {fname} → {out_name}")
-        n, m, b, L = read_instance(in_path)
-
-        start = time.time()
-        _, loads = LocalSearch(n, m, b).solve(L)
-        runtime_ms = int((time.time() - start) * 1000)
-
-        max_load = max(loads) if loads else 0
-        write_result(out_path, n, m, max_load, runtime_ms)
+        run_instance(in_path, out_path)
 
 if __name__ == "__main__":
     main()
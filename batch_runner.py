@@ -0,0 +1,136 @@
+import os, sys, time, argparse, importlib
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import Dict, List, NamedTuple, Tuple
+
+# tên phương pháp (tiền tố file kết quả) → (module, có nhận seed hay không)
+METHODS: Dict[str, Tuple[str, bool]] = {
+    "Greedy":      ("greedy",   False),
+    "LocalSearch": ("HCLS",     True),
+    "ALNS":        ("ALNS",     True),
+    "GP":          ("Gp",       True),
+    "MaxFlow":     ("maxflow",  False),
+    "ILP_gurobi":  ("gurobi",   False),
+    "ILP_Ortools": ("pywraplp", False),
+    "CP_Ortools":  ("ortools_cp", False),
+    "Decomposed":  ("preprocess", False),
+}
+
+
+class Job(NamedTuple):
+    method: str
+    in_path: str
+    out_path: str
+    seed: int
+    size: int          # kích thước file instance, dùng để xếp lịch
+
+
+def result_name(method: str, fname: str, seed: int, multi_seed: bool) -> str:
+    if not multi_seed:
+        return f"[{method}] {fname}"
+    stem, ext = os.path.splitext(fname)
+    return f"[{method}] {stem}_seed{seed}{ext}"
+
+
+def build_jobs(inst_dir: str, res_dir: str, methods: List[str], seeds: List[int]) -> List[Job]:
+    """
+    Tạo mọi tổ hợp (instance, method, seed) chưa có kết quả, instance lớn
+    xếp trước để các worker không phải chờ một job lớn ở cuối.
+    """
+    files = [f for f in os.listdir(inst_dir) if f.endswith(".txt")]
+    multi_seed = len(seeds) > 1
+    jobs = []
+    for fname in files:
+        in_path = os.path.join(inst_dir, fname)
+        size = os.path.getsize(in_path)
+        for method in methods:
+            seeded = METHODS[method][1]
+            for seed in (seeds if seeded else seeds[:1]):
+                out_name = result_name(method, fname, seed, multi_seed and seeded)
+                out_path = os.path.join(res_dir, out_name)
+                if os.path.exists(out_path):
+                    continue
+                jobs.append(Job(method, in_path, out_path, seed, size))
+    jobs.sort(key=lambda j: -j.size)
+    return jobs
+
+
+def run_job(job: Job):
+    """Chạy trong tiến trình con."""
+    module, seeded = METHODS[job.method]
+    mod = importlib.import_module(module)
+    if seeded:
+        mod.run_instance(job.in_path, job.out_path, seed=job.seed)
+    else:
+        mod.run_instance(job.in_path, job.out_path)
+
+
+def run_batch(jobs: List[Job], workers: int, timeout_s: float | None) -> Dict[str, int]:
+    """
+    Mỗi job chạy trong một tiến trình riêng (tối đa `workers` cùng lúc), nên
+    job quá giờ có thể bị kill và job crash không kéo theo các job khác.
+    """
+    pending = list(reversed(jobs))          # pop() lấy job lớn nhất trước
+    running: Dict[int, Tuple[mp.Process, Job, float]] = {}
+    stats = {"done": 0, "failed": 0, "timeout": 0}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            job = pending.pop()
+            proc = mp.Process(target=run_job, args=(job,), daemon=True)
+            proc.start()
+            running[proc.sentinel] = (proc, job, time.time())
+            print(f"[start] {job.method} {os.path.basename(job.in_path)} seed={job.seed}")
+
+        wait(list(running), timeout=1.0)
+
+        now = time.time()
+        for sentinel, (proc, job, started) in list(running.items()):
+            name = f"{job.method} {os.path.basename(job.in_path)} seed={job.seed}"
+            if proc.exitcode is None:
+                if timeout_s and now - started > timeout_s:
+                    proc.kill()
+                    proc.join()
+                    stats["timeout"] += 1
+                    print(f"[timeout] {name} after {int(now - started)} s")
+                else:
+                    continue
+            elif proc.exitcode == 0:
+                stats["done"] += 1
+                print(f"[done] {name} in {int(now - started)} s")
+                del running[sentinel]
+                continue
+            else:
+                stats["failed"] += 1
+                print(f"[failed] {name} (exit code {proc.exitcode})")
+            # xoá kết quả dở dang để lần chạy sau (resume) làm lại job này
+            if os.path.exists(job.out_path):
+                os.remove(job.out_path)
+            del running[sentinel]
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Chạy song song các phương pháp trên mọi instance")
+    ap.add_argument("--instances", default="instances", help="thư mục chứa file .txt")
+    ap.add_argument("--results", default="results", help="thư mục ghi kết quả")
+    ap.add_argument("--methods", nargs="+", default=list(METHODS), choices=list(METHODS))
+    ap.add_argument("--seeds", nargs="+", type=int, default=[42])
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--timeout", type=float, default=None,
+                    help="giới hạn wall-clock (giây) cho mỗi job")
+    args = ap.parse_args()
+
+    os.makedirs(args.results, exist_ok=True)
+    jobs = build_jobs(args.instances, args.results, args.methods, args.seeds)
+    print(f"{len(jobs)} job, {args.workers} worker")
+
+    start = time.time()
+    stats = run_batch(jobs, args.workers, args.timeout)
+    print(f"Xong sau {int(time.time() - start)} s: {stats['done']} ok, "
+          f"{stats['failed']} lỗi, {stats['timeout']} quá giờ")
+    return 0 if stats["failed"] == 0 and stats["timeout"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
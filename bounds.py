@@ -0,0 +1,74 @@
+import math
+import heapq
+
+import numpy as np
+
+from instance import Instance
+
+
+def trivial_bound(N: int, M: int, b: int) -> int:
+    """Tổng N*b lượt chấm chia đều cho M reviewer."""
+    return math.ceil(N * b / M) if M else 0
+
+
+def forced_bound(inst: Instance) -> int:
+    """
+    Paper có đúng b reviewer hợp lệ buộc phải nhận tất cả; tải tối đa ít nhất
+    bằng số paper như vậy dồn lên cùng một reviewer.
+    """
+    tight = inst.paper_deg() <= inst.b
+    if not tight.any():
+        return 0
+    cnt = np.bincount(inst.paper_rev[np.repeat(tight, inst.paper_deg())], minlength=inst.M)
+    return int(cnt.max())
+
+
+def peeling_bound(inst: Instance) -> int:
+    """
+    Cận kiểu Hall: với mọi tập reviewer S, paper i phải nhận ít nhất
+    max(0, b - |L(i) \\ S|) reviewer trong S, nên
+        z >= ceil( sum_i max(0, b - |L(i) \\ S|) / |S| ).
+    Bắt đầu từ S = toàn bộ reviewer rồi lần lượt bỏ reviewer có ít "cạnh chặt"
+    nhất (cạnh tới paper còn đòi hỏi S), giống bóc lõi đồ thị; giữ giá trị tốt
+    nhất trên cả chuỗi tập con. Độ phức tạp O(nnz log M).
+    """
+    N, M, b = inst.N, inst.M, inst.b
+    if M == 0:
+        return 0
+    paper_ptr = inst.paper_ptr.tolist()
+    paper_rev = inst.paper_rev.tolist()
+    rev_ptr   = inst.rev_ptr.tolist()
+    rev_pap   = inst.rev_pap.tolist()
+
+    outside = [0] * N                      # |L(i) \ S|
+    tight   = inst.rev_deg().tolist()      # số paper i ∋ r còn outside[i] < b
+    alive   = [True] * M
+    demand  = N * b
+    size    = M
+    best    = 0
+
+    heap = [(t, r) for r, t in enumerate(tight)]
+    heapq.heapify(heap)
+    while size:
+        best = max(best, -(-demand // size))
+        t, r = heapq.heappop(heap)
+        if not alive[r] or t != tight[r]:
+            continue
+        alive[r] = False
+        size -= 1
+        demand -= t
+        for i in rev_pap[rev_ptr[r]:rev_ptr[r + 1]]:
+            outside[i] += 1
+            if outside[i] == b:
+                # paper i thôi đòi hỏi S: các reviewer còn lại của nó mất một cạnh chặt
+                for r2 in paper_rev[paper_ptr[i]:paper_ptr[i + 1]]:
+                    if alive[r2]:
+                        tight[r2] -= 1
+                        heapq.heappush(heap, (tight[r2], r2))
+    return best
+
+
+def lower_bound(inst: Instance) -> int:
+    return max(trivial_bound(inst.N, inst.M, inst.b),
+               forced_bound(inst),
+               peeling_bound(inst))
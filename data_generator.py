@@ -1,95 +1,139 @@
-import random
-import numpy as np
-import matplotlib.pyplot as plt
 import os
+import argparse
+from typing import Iterator, Tuple
+
+import numpy as np
+
+# Một chunk là (ks, R): paper thứ j trong chunk có các reviewer R[j, :ks[j]]
+# (1-based); phần còn lại của hàng R chỉ là đệm.
+Chunk = Tuple[np.ndarray, np.ndarray]
 
-def write_L_to_file(L, N, M, b, distribution_name, output_dir="/content/sample_data"):
+CHUNK = 1 << 16
+
+
+def write_L_to_file(chunks: Iterator[Chunk], N, M, b, distribution_name, output_dir="datasets"):
+    """Ghi instance theo từng chunk, không giữ toàn bộ L trong bộ nhớ."""
     filename = f"{distribution_name}_{N}_{M}_{b}.txt"
     filepath = os.path.join(output_dir, filename)
 
     with open(filepath, "w") as f:
         f.write(f"{N} {M} {b}\n")
-        for i in range(1, N + 1):
-            reviewers = L[i]
-            f.write(f"{len(reviewers)} {' '.join(map(str, reviewers))}\n")
+        for ks, R in chunks:
+            rows = R.tolist()
+            f.write("".join(f"{k} {' '.join(map(str, row[:k]))}\n"
+                            for k, row in zip(ks.tolist(), rows)))
 
     return filepath
+
+# ---------- Vectorized sampling ----------
+
+def sample_distinct(rng, ks, lo, hi):
+    """
+    Với mỗi hàng j chọn ks[j] reviewer khác nhau, đều trong [lo, hi).
+    Pool nhỏ: xáo trộn cả pool bằng argsort trên ma trận ngẫu nhiên.
+    Pool lớn: rút có hoàn lại rồi rút lại các hàng bị trùng (hiếm khi k << pool).
+    """
+    n, pool = ks.size, hi - lo
+    kmax = int(ks.max()) if n else 0
+    if kmax > pool:
+        raise ValueError(f"Cannot pick {kmax} distinct reviewers out of {pool}")
+    if kmax == 0:
+        return np.zeros((n, 0), dtype=np.int64)
+
+    if pool <= 4 * kmax or pool <= 64:
+        return lo + np.argsort(rng.random((n, pool)), axis=1)[:, :kmax]
+
+    cols = np.arange(kmax)
+    pad  = cols >= ks[:, None]                    # ô đệm, không tính trùng
+    R    = rng.integers(0, pool, size=(n, kmax))
+    todo = np.arange(n)
+    while todo.size:
+        S = np.where(pad[todo], pool + cols, R[todo])
+        S.sort(axis=1)
+        dup = (S[:, 1:] == S[:, :-1]).any(axis=1)
+        todo = todo[dup]
+        if todo.size:
+            R[todo] = rng.integers(0, pool, size=(todo.size, kmax))
+    return lo + R
+
+
+def truncated(draw, size, min_k, max_k):
+    """Rút `size` mẫu từ draw(n) rồi chỉ giữ những mẫu nằm trong [min_k, max_k]."""
+    out, filled = np.empty(size, dtype=np.int64), 0
+    while filled < size:
+        s = np.asarray(draw(2 * (size - filled) + 16), dtype=np.int64)
+        s = s[(s >= min_k) & (s <= max_k)][:size - filled]
+        out[filled:filled + s.size] = s
+        filled += s.size
+    return out
+
+
+def _chunked(N, chunk):
+    for start in range(0, N, chunk):
+        yield start, min(chunk, N - start)
+
 # ---------- Data Generators (paper → reviewers) ----------
 
-def gen_L_uniform(N, M, min_k, max_k):
-    ks = np.random.randint(min_k, max_k + 1, size=N)
-    return {i+1: random.sample(range(1, M+1), ks[i]) for i in range(N)}
+def gen_L_uniform(rng, N, M, min_k, max_k, chunk=CHUNK) -> Iterator[Chunk]:
+    for _, n in _chunked(N, chunk):
+        ks = rng.integers(min_k, max_k + 1, size=n)
+        yield ks, sample_distinct(rng, ks, 1, M + 1)
 
-def gen_L_gaussian(N, M, mean, std, min_k, max_k):
-    ks = []
-    while len(ks) < N:
-        s = int(round(random.gauss(mean, std)))
-        if min_k <= s <= max_k:
-            ks.append(s)
-    return {i+1: random.sample(range(1, M+1), ks[i]) for i in range(N)}
+def gen_L_gaussian(rng, N, M, mean, std, min_k, max_k, chunk=CHUNK) -> Iterator[Chunk]:
+    for _, n in _chunked(N, chunk):
+        ks = truncated(lambda s: np.rint(rng.normal(mean, std, s)), n, min_k, max_k)
+        yield ks, sample_distinct(rng, ks, 1, M + 1)
 
-def gen_L_poisson(N, M, lam, min_k, max_k):
+def gen_L_poisson(rng, N, M, lam, min_k, max_k, chunk=CHUNK) -> Iterator[Chunk]:
     """
     k ~ Poisson(lam), rejection‐sampled into [min_k..max_k]
     """
-    ks = []
-    while len(ks) < N:
-        s = np.random.poisson(lam)
-        if min_k <= s <= max_k:
-            ks.append(s)
-    return {i+1: random.sample(range(1, M+1), ks[i]) for i in range(N)}
-
-def gen_L_exponential(N, M, scale, min_k, max_k):
+    for _, n in _chunked(N, chunk):
+        ks = truncated(lambda s: rng.poisson(lam, s), n, min_k, max_k)
+        yield ks, sample_distinct(rng, ks, 1, M + 1)
+
+def gen_L_exponential(rng, N, M, scale, min_k, max_k, chunk=CHUNK) -> Iterator[Chunk]:
     """
     k ~ Exp(scale), rejection‐sampled into [min_k..max_k]
     """
-    ks = []
-    while len(ks) < N:
-        s = int(round(np.random.exponential(scale)))
-        if min_k <= s <= max_k:
-            ks.append(s)
-    return {i+1: random.sample(range(1, M+1), ks[i]) for i in range(N)}
-
-def gen_bait_and_trap(N, M, b, rare_group_size=5, rare_per_paper=1, common_pool_size=None, burn_rate=0.7):
+    for _, n in _chunked(N, chunk):
+        ks = truncated(lambda s: np.rint(rng.exponential(scale, s)), n, min_k, max_k)
+        yield ks, sample_distinct(rng, ks, 1, M + 1)
+
+def gen_bait_and_trap(rng, N, M, b, rare_group_size=5, rare_per_paper=1, common_pool_size=None,
+                      burn_rate=0.7, chunk=CHUNK) -> Iterator[Chunk]:
     """
     - rare_group_size: number of 'rare' reviewers.
     - rare_per_paper: how many rare reviewers each paper initially shows.
     - common_pool_size: number of 'common' reviewers (default = M - rare_group_size)
-    
+
     Papers 1..P0: only rare reviewers + common ones
     Papers P0+1..N: only common reviewers
-    Greedy will use up rares on the first block, then be forced to use common 
+    Greedy will use up rares on the first block, then be forced to use common
     ones exclusively on the second block—but common ones get overloaded late.
     """
     if common_pool_size is None:
         common_pool_size = M - rare_group_size
+    rare   = (1, rare_group_size + 1)
+    common = (rare_group_size + 1, rare_group_size + common_pool_size + 1)
 
-    rare = list(range(1, rare_group_size + 1))
-    common = list(range(rare_group_size + 1, rare_group_size + common_pool_size + 1))
-    L = {}
-
-    # Divide papers into two blocks:
-    #   Block A: first 70% of papers (to bait greedy)
-    #   Block B: last 30% of papers (trap)
+    # Block A: first burn_rate of papers (to bait greedy), Block B: the rest (trap)
     P0 = int(burn_rate * N)
+    k  = 2 * b
 
-    for i in range(1, N + 1):
-        if i <= P0:
-            # Block A: give each paper a few rare reviewers + a few common
-            reviewers = []
-            # ensure at least one rare is available (greedy will pick them)
-            reviewers += random.sample(rare, rare_per_paper)
-            # fill up to, say, 2*b slots with random common
-            reviewers += random.sample(common, b * 2 - rare_per_paper)
-        else:
-            # Block B: no rares here—only common reviewers
-            reviewers = random.sample(common, b * 2)
-        L[i] = reviewers
-
-    return L
+    for start, n in _chunked(N, chunk):
+        in_a = np.arange(start, start + n) < P0
+        R = np.empty((n, k), dtype=np.int64)
+        na = int(in_a.sum())
+        if na:
+            R[:na, :rare_per_paper] = sample_distinct(rng, np.full(na, rare_per_paper), *rare)
+            R[:na, rare_per_paper:] = sample_distinct(rng, np.full(na, k - rare_per_paper), *common)
+        if n - na:
+            R[na:] = sample_distinct(rng, np.full(n - na, k), *common)
+        yield np.full(n, k), R
 
 
-# ---------- Scenario Setup & Plotting ----------
+# ---------- Scenario Setup ----------
 """
         (50, 5,2),
         (100, 10 , 3),
@@ -102,33 +146,51 @@ def gen_bait_and_trap(N, M, b, rare_group_size=5, rare_per_paper=1, common_pool_
         (10000, 600, 6),
         (20000, 1000, 6)
 """
-N, M, b = 1000, 80, 5
-min_u, max_u = 2, min(20,M//4)
-min_g, max_g = 2, min(10,M//4)
-min_p, max_p = 2, min(20,M//3)
-min_e, max_e = 2, min(30,M//2)
-# min_u, max_u = b//4, b*2
-# min_g, max_g = b//4, b*2
-# min_p, max_p = b//4, b*3
-# min_e, max_e = b//4, b*5
-mean, std = (min_g+max_g)//2, 2            # widen Gaussian a bit (min_g < mean < max_g, mean ~ (min+max)/2, std should remain still)
-lam = 5                       # Poisson λ (min_p < lam < max_p, 2 situation: lam near min_p / near max_p)
-scale = 3                     # Exponential scale (min_e < scale < max_e, 2 situation: lam near min_e / near max_e)
-rare_group=int(0.15*M)
-rare_freq=1
-burn_rate=0.6
-scenarios = {
-    "Uniform":   gen_L_uniform(N, M, b+min_u, b+max_u),
-    "Gaussian":  gen_L_gaussian(N, M, b+mean, std, b+min_g, b+max_g),
-    "Poisson":   gen_L_poisson(N, M, b+lam, b+min_p, b+max_p),
-    "Exponential": gen_L_exponential(N, M, b+scale, b+min_e, b+max_e),
-    "Adversarial": gen_bait_and_trap(N,M,b, rare_group_size=rare_group, rare_per_paper=rare_freq, burn_rate=burn_rate),
-}
-
-
-output_dir="E:\\20242\\Fundamentals of Optimization\\own_prj\\Optimization_Strategies_for_the_Reviewer_Assignment_Problem\\datasets"
-# Generate files for each distribution
-generated_files = {}
-for name, L in scenarios.items():
-    path = write_L_to_file(L, N, M, b, name, output_dir= output_dir)
-    generated_files[name] = path
\ No newline at end of file
+DISTRIBUTIONS = ["Uniform", "Gaussian", "Poisson", "Exponential", "Adversarial"]
+
+
+def scenario(name, rng, N, M, b, chunk=CHUNK) -> Iterator[Chunk]:
+    """Tham số mặc định của các bộ dữ liệu trong datasets/."""
+    def rng_k(lo, hi):                # khoảng số reviewer hợp lệ, không vượt quá M
+        return min(b + lo, M), max(min(b + hi, M), min(b + lo, M))
+
+    if name == "Uniform":
+        return gen_L_uniform(rng, N, M, *rng_k(2, min(20, M // 4)), chunk=chunk)
+    if name == "Gaussian":
+        min_g, max_g = 2, min(10, M // 4)
+        mean, std = (min_g + max_g) // 2, 2      # widen Gaussian a bit (min_g < mean < max_g)
+        return gen_L_gaussian(rng, N, M, b + mean, std, *rng_k(min_g, max_g), chunk=chunk)
+    if name == "Poisson":
+        lam = 5                                  # Poisson λ (min_p < lam < max_p)
+        return gen_L_poisson(rng, N, M, b + lam, *rng_k(2, min(20, M // 3)), chunk=chunk)
+    if name == "Exponential":
+        scale = 3                                # Exponential scale (min_e < scale < max_e)
+        return gen_L_exponential(rng, N, M, b + scale, *rng_k(2, min(30, M // 2)), chunk=chunk)
+    if name == "Adversarial":
+        return gen_bait_and_trap(rng, N, M, b, rare_group_size=int(0.15 * M),
+                                 rare_per_paper=1, burn_rate=0.6, chunk=chunk)
+    raise ValueError(f"Unknown distribution {name}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sinh instance cho bài toán phân công reviewer")
+    ap.add_argument("--dist", nargs="+", default=DISTRIBUTIONS, choices=DISTRIBUTIONS)
+    ap.add_argument("-N", type=int, required=True, help="số paper")
+    ap.add_argument("-M", type=int, required=True, help="số reviewer")
+    ap.add_argument("-b", type=int, required=True, help="số reviewer cần cho mỗi paper")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out-dir", default="datasets")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="số paper sinh và ghi mỗi lần")
+    args = ap.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name in args.dist:
+        # mỗi phân phối một luồng ngẫu nhiên riêng, không phụ thuộc thứ tự --dist
+        rng = np.random.default_rng([args.seed, DISTRIBUTIONS.index(name)])
+        path = write_L_to_file(scenario(name, rng, args.N, args.M, args.b, args.chunk),
+                               args.N, args.M, args.b, name, output_dir=args.out_dir)
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,156 @@
 import os
+import sys
 import time
+from typing import Tuple
 
-class Reviewer:
-    def __init__(self, ID: int):
-        self.ID = ID         # 1-based ID
-        self.papers = []     # các Paper mà reviewer này có thể chấm
-
-    def __str__(self) -> str:
-        ans = f"Reviewer {self.ID}\n"
-        for paper in self.papers:
-            ans += f"\tPaper {paper.ID}\n"
-        return ans
-
-
-class Paper:
-    def __init__(self, ID: int):
-        self.ID = ID               # 1-based ID
-        self.reviewers = []        # list Reviewer sẵn sàng chấm
-        self.sol = []              # list Reviewer thực sự được gán
-
-    def __str__(self) -> str:
-        ans = f"Paper {self.ID}\n"
-        for reviewer in self.reviewers:
-            ans += f"\tReviewer {reviewer.ID}\n"
-        return ans
-
+import numpy as np
 
+from instance import Instance, load_instance
+from bounds import trivial_bound, forced_bound, lower_bound
+from results_store import record
 
 def InputFile(filename: str):
-    with open(filename, "r") as f:
-        n, m, b = map(int, f.readline().split())
-        prefs = []
-        for _ in range(n):
-            parts = list(map(int, f.readline().split()))
-            reviewers = [r - 1 for r in parts[1:]]  # chuyển 0-based
-            prefs.append(reviewers)
-        return n, m, b, prefs
-
-
-def build_objects(n: int, m: int, paper_prefs):
-
-    reviewers = [Reviewer(i + 1) for i in range(m)]   # 1-based ID
-    papers = [Paper(i + 1) for i in range(n)]
-
-    for p_idx, pref in enumerate(paper_prefs):
-        for r_idx in pref:
-            r = reviewers[r_idx]
-            papers[p_idx].reviewers.append(r)
-            r.papers.append(papers[p_idx])
-    return papers, reviewers
-
-
-
-class Solver:
-    def __init__(self, papers, reviewers, b: int):
-        self.papers = papers
-        self.reviewers = reviewers
-        self.b = b
-
-    def solve(self):
-       
-        self.papers.sort(key=lambda p: len(p.reviewers))
-
-   
-        load = {rev.ID: 0 for rev in self.reviewers}
-
-      
-        for _ in range(self.b):
-            for paper in self.papers:
-           
-                reviewer = min(
-                    paper.reviewers,
-                    key=lambda rev: (load[rev.ID], len(rev.papers))
-                )
-                paper.sol.append(reviewer)
-                load[reviewer.ID] += 1
-                paper.reviewers.remove(reviewer)
-
-   
-        return max(load.values()) if load else 0
+    inst = load_instance(filename)
+    return inst.N, inst.M, inst.b, inst.to_lists()  # 0-based
+
+
+BLOCK = 1024      # số paper tối đa được chọn reviewer cùng lúc trong một lượt
+
+
+def solve_greedy(inst: Instance, block: int = BLOCK,
+                 base: np.ndarray = None) -> Tuple[int, np.ndarray]:
+    """
+    Greedy trên mảng phẳng, trả về (tải tối đa, ma trận (N, b) reviewer
+    0-based của từng paper). Không sửa dữ liệu của inst. base: tải cố định
+    sẵn có của từng reviewer (vd. paper bị gán cứng đã tách ra), tính cả vào
+    tải khi chọn và vào tải tối đa trả về.
+
+    Cùng luật với bản dùng object: paper xếp theo số reviewer hợp lệ tăng dần,
+    b lượt, mỗi lượt từng paper lấy reviewer chưa chọn có (tải, số paper) nhỏ
+    nhất, hoà thì lấy reviewer đứng trước trong L(i). Khoá đó được gói thành một
+    số nguyên trên mỗi cạnh nên mỗi khối `block` paper chỉ cần một phép
+    minimum.reduceat. Paper trong khối thấy tải ở đầu khối; lựa chọn của nó vẫn
+    đúng như khi chạy tuần tự cho tới paper đầu tiên chọn trùng reviewer với
+    một paper đứng trước (các reviewer khác có tăng tải thì vẫn thua). Chỉ
+    phần đầu khối đó được ghi nhận, phần còn lại chấm lại với tải mới, nên
+    kết quả giống hệt bản tuần tự với mọi `block`. Khối co lại khi hay trùng
+    và nở ra (tới `block`) khi không trùng.
+    """
+    N, M, b, nnz = inst.N, inst.M, inst.b, inst.nnz
+    base = np.zeros(M, dtype=np.int64) if base is None else np.asarray(base, dtype=np.int64)
+    if N == 0:
+        return int(base.max(initial=0)), np.zeros((0, b), dtype=np.int32)
+    pdeg = inst.paper_deg()
+    if pdeg.min() < b:
+        raise ValueError("Some paper has fewer than b eligible reviewers")
+
+    order = np.argsort(pdeg, kind="stable")
+    sdeg  = pdeg[order]
+    ptr   = np.zeros(N + 1, dtype=np.int64)
+    np.cumsum(sdeg, out=ptr[1:])
+
+    # khoá = tải * C + số paper của reviewer * D + vị trí trong L(i);
+    # cạnh đã chọn mang khoá >= USED nên không bao giờ thắng nữa
+    rdeg = inst.rev_deg().astype(np.int64)
+    cap  = int((rdeg + base).max())                # tải không thể vượt cap
+    D    = int(sdeg[-1]) + 1
+    C    = (int(rdeg.max()) + 1) * D
+    USED = (cap + 2) * C
+    kt   = np.int32 if 2 * USED < 2 ** 31 else np.int64
+
+    # cạnh theo thứ tự xử lý; paper cùng bậc tạo thành một ma trận (n_d, d)
+    rev    = np.empty(nnz, dtype=np.int64)
+    static = np.empty(nnz, dtype=kt)
+    paper_ptr, paper_rev = np.asarray(inst.paper_ptr), np.asarray(inst.paper_rev)
+    cut = np.flatnonzero(np.r_[True, sdeg[1:] != sdeg[:-1], True])
+    for g0, g1 in zip(cut[:-1], cut[1:]):
+        cols = np.arange(sdeg[g0])
+        R = paper_rev[paper_ptr[order[g0:g1], None] + cols]
+        rev[ptr[g0]:ptr[g1]]    = R.ravel()
+        static[ptr[g0]:ptr[g1]] = (rdeg[R] * D + cols).ravel()
+
+    load  = base.astype(kt)
+    owner = np.empty(M, dtype=np.int64)
+    A     = np.empty((N, b), dtype=np.int32)       # theo thứ tự xử lý
+
+    for t in range(b):
+        s, w = 0, block
+        while s < N:
+            e = min(s + w, N)
+            key = load[rev[ptr[s]:ptr[e]]]
+            key *= C
+            key += static[ptr[s]:ptr[e]]
+            pick = ptr[s:e] + np.minimum.reduceat(key, ptr[s:e] - ptr[s]) % D
+            r = rev[pick]
+            # paper đầu tiên chọn trùng reviewer với paper đứng trước: dừng ở đó
+            n = e - s
+            k = np.arange(n)
+            owner[r[::-1]] = k[::-1]
+            clash = np.flatnonzero(owner[r] != k)
+            j = int(clash[0]) if clash.size else n
+            load[r[:j]] += 1
+            static[pick[:j]] = USED
+            A[s:s + j, t] = r[:j]
+            s += j
+            w = min(block, 2 * n) if j == n else 2 * j
+
+    out = np.empty_like(A)
+    out[order] = A
+    return int(load.max()), out
+
+
+def warm_start(inst: Instance, base: np.ndarray = None) -> Tuple[int, np.ndarray]:
+    """
+    Nghiệm khởi đầu cho các solver chính xác: (tải tối đa của greedy, mảng
+    bool theo thứ tự cạnh CSR cho biết cạnh (paper, reviewer) nào được chọn).
+    base: tải cố định của từng reviewer, như ở solve_greedy.
+    """
+    objective, A = solve_greedy(inst, base=base)
+    N, M = inst.N, inst.M
+    paper = np.repeat(np.arange(N, dtype=np.int64), inst.paper_deg())
+    chosen = np.repeat(np.arange(N, dtype=np.int64), inst.b) * M + A.ravel()
+    return objective, np.isin(paper * M + inst.paper_rev, chosen)
 
 
 def run_instance(input_path: str, output_path: str):
-    n, m, b, prefs = InputFile(input_path)
-    papers, reviewers = build_objects(n, m, prefs)
+    start, cpu = time.time(), time.process_time()
+    inst = load_instance(input_path)
+    n, m, b = inst.N, inst.M, inst.b
+    objective, _ = solve_greedy(inst)  # max load
+    runtime_ms = int((time.time() - start) * 1000)
+    cpu_ms     = int((time.process_time() - cpu) * 1000)
 
-    solver = Solver(papers, reviewers, b)
-    objective = solver.solve()  # max load
+    # nhãn trạng thái tính ngoài thời gian đo: cận rẻ trước, cận bóc lõi chỉ khi cần
+    cheap = max(trivial_bound(n, m, b), forced_bound(inst))
+    status = "OPTIMAL" if objective <= cheap or objective <= lower_bound(inst) else "FEASIBLE"
 
     with open(output_path, "w") as f:
         f.write(f"{os.path.basename(output_path)}\n")
         f.write(f"n = {n}\n")
         f.write(f"m = {m}\n")
-        f.write(f"Objective Value: {objective}\n") 
+        f.write(f"Objective Value: {objective} {status}\n")
+        f.write(f"{runtime_ms} ms\n")
+    record(output_path, "Greedy", input_path, inst, objective, status, runtime_ms, cpu_ms)
+
+
 
+def check_blocks(paths) -> bool:
+    """
+    Kiểm tra block=1 (tuần tự thuần) và block mặc định cho cùng phân công
+    trên từng instance: `python greedy.py --check file...`.
+    """
+    ok = True
+    for path in paths:
+        inst = load_instance(path)
+        same = np.array_equal(solve_greedy(inst, block=1)[1], solve_greedy(inst)[1])
+        ok &= same
+        print(f"{os.path.basename(path)}: {'OK' if same else 'KHÁC'}")
+    return ok
 
 
 def main():
+    if sys.argv[1:2] == ["--check"]:
+        sys.exit(0 if check_blocks(sys.argv[2:]) else 1)
     cur_dir = os.getcwd()
     instances_dir = os.path.join(cur_dir, "instances")
     results_dir   = os.path.join(cur_dir, "results")
@@ -109,14 +163,7 @@ def main():
         out_name = f"[Greedy] {fname}"
         out_path = os.path.join(results_dir, out_name)
         print(f"Đang xử lý: {fname} → {out_name}")
-
-        start = time.time()
         run_instance(in_path, out_path)
-        runtime_ms = int((time.time() - start) * 1000)
-
-        # Ghi thêm thời gian chạy
-        with open(out_path, "a") as f:
-            f.write(f"{runtime_ms} ms\n")
 
 
 if __name__ == "__main__":
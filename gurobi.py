@@ -2,66 +2,154 @@ import gurobipy as gp
 from gurobipy import GRB
 import os
 import time
+import numpy as np
+from instance import load_instance
+from bounds import lower_bound
+from greedy import warm_start
+from results_store import Progress, record
 
 def InputFile(filename):
     """Đọc dữ liệu từ file và điều chỉnh chỉ số reviewer về dạng 0-based."""
-    with open(filename, 'r') as f:
-        n, m, b = map(int, f.readline().split())
-        paper_preferences = []
-        for _ in range(n):
-            parts = list(map(int, f.readline().split()))
-            reviewers = [r - 1 for r in parts[1:]]  # Chuyển về chỉ số 0-based
-            paper_preferences.append(reviewers)
-        return n, m, b, paper_preferences
-
-def solve_reviewers_assignment_ilp(n, m, b, paper_prefs, output_file):
-    """Giải bài toán phân công reviewer và ghi kết quả vào file output."""
-    try:
-        # Tạo model Gurobi
-        model = gp.Model("reviewers_assignment")
-
-        # Tạo list các cặp (i, r) hợp lệ
-        valid_pairs = [(i, r) for i in range(n) for r in paper_prefs[i]]
-
-        # Khai báo biến x cho các cặp hợp lệ
-        x = model.addVars(valid_pairs, vtype=GRB.BINARY, name="x")
-
-        # Khai báo biến max_load
-        max_load = model.addVar(vtype=GRB.INTEGER, name="max_load")
-
-        # Ràng buộc: mỗi paper có đúng b reviewer
-        for i in range(n):
-            model.addConstr(gp.quicksum(x[i, r] for r in paper_prefs[i]) == b)
-
-        # Tạo list reviewer_papers
-        reviewer_papers = [[] for _ in range(m)]
-        for i in range(n):
-            for r in paper_prefs[i]:
-                reviewer_papers[r].append(i)
-
-        # Ràng buộc: max_load >= tải của mỗi reviewer
-        for r in range(m):
-            if reviewer_papers[r]:
-                model.addConstr(max_load >= gp.quicksum(x[i, r] for i in reviewer_papers[r]))
-
-        # Đặt mục tiêu: tối thiểu hóa max_load
-        model.setObjective(max_load, GRB.MINIMIZE)
-
-        # Giải model
+    inst = load_instance(filename)
+    return inst.N, inst.M, inst.b, inst.to_lists()  # chỉ số 0-based
+
+def progress_callback(progress):
+    """
+    Callback Gurobi: ghi (incumbent, cận) vào progress ở mỗi nghiệm mới và ở
+    các lần gọi định kỳ trong cây nhánh cận; dừng khi gap đứng yên.
+    """
+    def callback(model, where):
+        if where == GRB.Callback.MIPSOL:
+            inc, bnd = model.cbGet(GRB.Callback.MIPSOL_OBJBST), model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+        elif where == GRB.Callback.MIP:
+            inc, bnd = model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND)
+        else:
+            return
+        if progress.log(inc if inc < GRB.INFINITY else None, bnd):
+            model.terminate()
+    return callback
+
+def solve_model(n, m, b, paper_prefs, lb=0, hint=None, progress=None, base=None, threads=None,
+                time_limit=None):
+    """
+    Dựng và giải mô hình Gurobi, trả về (objective, status, chosen): chosen
+    là mảng bool theo thứ tự cạnh CSR (valid_pairs), None nếu không có
+    nghiệm. hint = warm_start(inst, base): nghiệm greedy làm MIP start,
+    max_load bị giới hạn trong [lb, objective của greedy]. base: tải cố định
+    sẵn có của từng reviewer; threads: số luồng Gurobi (None = mặc định,
+    mọi lõi); time_limit: giây (None = không giới hạn). progress
+    (results_store.Progress) nhận (incumbent, cận) trong lúc giải; nếu nó
+    dừng Gurobi sớm thì trả về nghiệm tốt nhất đã có với trạng thái FEASIBLE.
+    """
+    fixed = [0] * m if base is None else np.asarray(base, dtype=np.int64).tolist()
+
+    # Tạo model Gurobi
+    model = gp.Model("reviewers_assignment")
+
+    # Tạo list các cặp (i, r) hợp lệ
+    valid_pairs = [(i, r) for i in range(n) for r in paper_prefs[i]]
+
+    # Khai báo biến x cho các cặp hợp lệ
+    x = model.addVars(valid_pairs, vtype=GRB.BINARY, name="x")
+
+    # Khai báo biến max_load, miền [lb, nghiệm heuristic]
+    ub = max(lb, hint[0]) if hint is not None else n + max(fixed, default=0)
+    max_load = model.addVar(lb=lb, ub=ub, vtype=GRB.INTEGER, name="max_load")
+
+    # Ràng buộc: mỗi paper có đúng b reviewer
+    for i in range(n):
+        model.addConstr(gp.quicksum(x[i, r] for r in paper_prefs[i]) == b)
+
+    # Tạo list reviewer_papers
+    reviewer_papers = [[] for _ in range(m)]
+    for i in range(n):
+        for r in paper_prefs[i]:
+            reviewer_papers[r].append(i)
+
+    # Ràng buộc: max_load >= tải của mỗi reviewer (kể cả tải cố định)
+    for r in range(m):
+        if reviewer_papers[r]:
+            model.addConstr(max_load >= gp.quicksum(x[i, r] for i in reviewer_papers[r]) + fixed[r])
+
+    # Đặt mục tiêu: tối thiểu hóa max_load
+    model.setObjective(max_load, GRB.MINIMIZE)
+
+    # MIP start: valid_pairs theo đúng thứ tự cạnh CSR như hint[1]
+    if hint is not None:
+        model.setAttr(GRB.Attr.Start, list(x.values()), hint[1].astype(float).tolist())
+        max_load.Start = hint[0]
+    # objective nguyên: khoảng cách tuyệt đối < 1 nghĩa là đã tối ưu
+    model.Params.MIPGapAbs = 0.999
+    if threads is not None:
+        model.Params.Threads = threads
+    if time_limit is not None:
+        model.Params.TimeLimit = time_limit
+
+    # Giải model
+    if progress is not None:
+        model.optimize(progress_callback(progress))
+    else:
         model.optimize()
 
-        # Ghi kết quả vào file output
-        with open(output_file, 'w') as f:
-            if model.status == GRB.OPTIMAL:
-                f.write(f"{str(output_file).split("\\")[-1]}\n")
-                f.write(f"n = {n}\nm = {m}\n")
-                f.write(f"Objective Value: {int(max_load.x)}\n")
-            else:
-                f.write("No solution found.\n")
-    except gp.GurobiError as e:
-        print(f"Gurobi error: {e}")
-    except Exception as e:
-        print(f"Error: {e}")
+    # hết giờ hoặc bị dừng sớm vẫn có nghiệm
+    if model.SolCount == 0:
+        return None, "NO_SOLUTION", None
+    status = "OPTIMAL" if model.status == GRB.OPTIMAL else "FEASIBLE"
+    if progress is not None:
+        progress.log(max_load.x, model.ObjBound)
+    chosen = np.array(model.getAttr(GRB.Attr.X, list(x.values())), dtype=float) > 0.5
+    return int(round(max_load.x)), status, chosen
+
+def solve_reviewers_assignment_ilp(n, m, b, paper_prefs, output_file, lb=0, hint=None,
+                                   progress=None):
+    """
+    Giải bài toán phân công reviewer (solve_model) và ghi kết quả vào file
+    output. Lỗi Gurobi (license, bộ nhớ, ...) không bị nuốt: file kết quả
+    không được tạo và tiến trình thoát với mã lỗi, để batch_runner tính job
+    là lỗi và chạy lại khi resume.
+    """
+    obj, status, _ = solve_model(n, m, b, paper_prefs, lb=lb, hint=hint, progress=progress)
+
+    # Ghi kết quả vào file output
+    with open(output_file, 'w') as f:
+        if obj is not None:
+            f.write(f"{os.path.basename(output_file)}\n")
+            f.write(f"n = {n}\nm = {m}\n")
+            f.write(f"Objective Value: {obj} {status}\n")
+        else:
+            f.write("No solution found.\n")
+    return obj, status
+
+def run_instance(input_path, output_path, stall_s=None):
+    """
+    Giải một instance và ghi kết quả kèm thời gian chạy vào output_path.
+    Tiến trình giải được ghi vào store; stall_s: dừng khi gap không giảm
+    trong stall_s giây.
+    """
+    inst = load_instance(input_path)
+    n, m, b, paper_preferences = inst.N, inst.M, inst.b, inst.to_lists()
+    start_time, start_cpu = time.time(), time.process_time()  # Ghi lại thời điểm bắt đầu
+    progress = Progress(output_path, "ILP_gurobi", input_path, inst, stall_s=stall_s)
+    lb, hint = lower_bound(inst), warm_start(inst)
+    progress.log(hint[0], lb)
+    if hint[0] <= lb:
+        # greedy đã chạm cận dưới: tối ưu, không cần gọi Gurobi
+        obj, status = hint[0], "OPTIMAL"
+        with open(output_path, 'w') as f:
+            f.write(f"{os.path.basename(output_path)}\n")
+            f.write(f"n = {n}\nm = {m}\n")
+            f.write(f"Objective Value: {obj} {status}\n")
+    else:
+        obj, status = solve_reviewers_assignment_ilp(n, m, b, paper_preferences, output_path,
+                                                     lb=lb, hint=hint, progress=progress)
+    end_time = time.time()    # Ghi lại thời điểm kết thúc
+    run_time = end_time - start_time  # Tính thời gian chạy
+    cpu_ms = int((time.process_time() - start_cpu) * 1000)
+    # Ghi thêm thời gian chạy vào file output
+    with open(output_path, 'a') as f:
+        f.write(f"{int(run_time * 1000)} ms\n")
+    record(output_path, "ILP_gurobi", input_path, inst, obj, status, int(run_time * 1000), cpu_ms,
+           params={"stall_s": stall_s}, run=progress.run)
 
 def main():
     """Hàm chính để chạy solver trên tất cả file .txt trong thư mục 'instances' và ghi kết quả vào 'results'."""
@@ -89,14 +177,7 @@ def main():
         output_path = os.path.join(results_dir, output_filename)
         print(f"Đang xử lý file: {filename} -> {output_filename}")
         try:
-            n, m, b, paper_preferences = InputFile(input_path)
-            start_time = time.time()  # Ghi lại thời điểm bắt đầu
-            solve_reviewers_assignment_ilp(n, m, b, paper_preferences, output_path)
-            end_time = time.time()    # Ghi lại thời điểm kết thúc
-            run_time = end_time - start_time  # Tính thời gian chạy
-            # Ghi thêm thời gian chạy vào file output
-            with open(output_path, 'a') as f:
-                f.write(f"{int(run_time * 1000)} ms\n")
+            run_instance(input_path, output_path)
         except Exception as e:
             print(f"Lỗi khi xử lý file {filename}: {e}")
 
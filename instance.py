@@ -0,0 +1,256 @@
+import os, sys, struct, zlib, argparse
+from typing import List, Tuple
+
+import numpy as np
+
+
+class Instance:
+    """
+    Bài toán phân công reviewer dưới dạng CSR (mọi ID đều 0-based).
+
+    paper_ptr / paper_rev : paper i có các reviewer paper_rev[paper_ptr[i]:paper_ptr[i+1]]
+    rev_ptr   / rev_pap   : reviewer r có thể chấm rev_pap[rev_ptr[r]:rev_ptr[r+1]]
+    rev_edge              : vị trí tương ứng của từng phần tử rev_pap trong paper_rev
+                            (cạnh (i, r) có cùng một chỉ số ở cả hai chiều)
+    """
+
+    def __init__(self, N: int, M: int, b: int,
+                 paper_ptr: np.ndarray, paper_rev: np.ndarray,
+                 rev_ptr: np.ndarray = None, rev_pap: np.ndarray = None,
+                 rev_edge: np.ndarray = None):
+        self.N = N
+        self.M = M
+        self.b = b
+        self.paper_ptr = paper_ptr
+        self.paper_rev = paper_rev
+        if rev_ptr is None:
+            rev_ptr, rev_pap, rev_edge = transpose(N, M, paper_ptr, paper_rev)
+        self.rev_ptr = rev_ptr
+        self.rev_pap = rev_pap
+        self.rev_edge = rev_edge
+
+    @property
+    def nnz(self) -> int:
+        return int(self.paper_ptr[-1])
+
+    def paper_deg(self) -> np.ndarray:
+        return np.diff(self.paper_ptr)
+
+    def rev_deg(self) -> np.ndarray:
+        return np.diff(self.rev_ptr)
+
+    def edge_paper(self) -> np.ndarray:
+        """Paper (0-based) của từng cạnh theo thứ tự paper_rev."""
+        return np.repeat(np.arange(self.N, dtype=np.int32), self.paper_deg())
+
+    def candidates(self, i: int) -> np.ndarray:
+        return self.paper_rev[self.paper_ptr[i]:self.paper_ptr[i + 1]]
+
+    def papers_of(self, r: int) -> np.ndarray:
+        return self.rev_pap[self.rev_ptr[r]:self.rev_ptr[r + 1]]
+
+    def to_lists(self, one_based: bool = False) -> List[List[int]]:
+        """Danh sách L[i] kiểu cũ cho các solver còn làm việc trên list."""
+        flat = (self.paper_rev + 1 if one_based else self.paper_rev).tolist()
+        ptr = self.paper_ptr.tolist()
+        return [flat[ptr[i]:ptr[i + 1]] for i in range(self.N)]
+
+    def __repr__(self) -> str:
+        return f"Instance(N={self.N}, M={self.M}, b={self.b}, nnz={self.nnz})"
+
+
+def transpose(N: int, M: int, paper_ptr: np.ndarray, paper_rev: np.ndarray
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dựng chỉ mục reviewer → paper từ CSR paper → reviewer bằng counting sort:
+    rev_ptr là bincount + cumsum theo reviewer, rev_edge là thứ tự ổn định của
+    các cạnh theo reviewer, lấy bằng radix sort trên các chữ số 16 bit (NumPy
+    sắp khoá 16 bit ổn định bằng counting sort, O(nnz) mỗi lượt).
+    """
+    rev_ptr = np.zeros(M + 1, dtype=np.int32)
+    np.cumsum(np.bincount(paper_rev, minlength=M), out=rev_ptr[1:])
+    rev_edge = None
+    for shift in range(0, max(M - 1, 1).bit_length(), 16):
+        key = paper_rev if rev_edge is None else paper_rev[rev_edge]
+        order = np.argsort(((key >> shift) & 0xFFFF).astype(np.uint16), kind="stable")
+        rev_edge = order if rev_edge is None else rev_edge[order]
+    rev_edge = rev_edge.astype(np.int32)
+    edge_paper = np.repeat(np.arange(N, dtype=np.int32), np.diff(paper_ptr))
+    rev_pap = edge_paper[rev_edge]
+    return rev_ptr, rev_pap, rev_edge
+
+
+def from_lists(N: int, M: int, b: int, L, one_based: bool = False) -> Instance:
+    """Dựng Instance từ L[i] (list hoặc dict 1-based như trong HCLS.py)."""
+    rows = [L[i + 1] for i in range(N)] if isinstance(L, dict) else L
+    deg = np.fromiter((len(r) for r in rows), dtype=np.int32, count=N)
+    paper_ptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(deg, out=paper_ptr[1:])
+    paper_rev = np.fromiter((r for row in rows for r in row),
+                            dtype=np.int32, count=int(paper_ptr[-1]))
+    if one_based:
+        paper_rev -= 1
+    return Instance(N, M, b, paper_ptr, paper_rev)
+
+
+# ---------- text format --------------------------------------------
+def parse_instance(data: bytes) -> Instance:
+    """
+    Định dạng văn bản (mỗi paper một dòng, bỏ qua dòng trống):
+    n m b
+    k reviewer1 reviewer2 ...      (reviewer đánh số 1-based)
+
+    Toàn bộ file được tách token trong một lần bằng NumPy; token đầu mỗi dòng
+    (số k) tìm bằng vị trí ký tự xuống dòng, không có vòng Python theo paper.
+    """
+    tok = np.fromstring(data, dtype=np.int64, sep=" ")
+    if tok.size < 3:
+        raise ValueError("Missing header 'n m b'")
+    N, M, b = (int(x) for x in tok[:3])
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    space = buf <= 32                       # ' ', \t, \n, \r, ...
+    starts = np.flatnonzero(~space & np.r_[True, space[:-1]])
+    if starts.size != tok.size:
+        raise ValueError(f"Non-integer token after {tok.size} tokens")
+    # token đầu dòng = token đầu tiên sau mỗi ký tự xuống dòng (dòng trống
+    # cho cùng một token nên gộp lại), cộng token đầu file
+    after = np.searchsorted(starts, np.flatnonzero(buf == 10))
+    after = after[after < tok.size]
+    firsts = np.r_[0, after]
+    firsts = firsts[np.r_[True, firsts[1:] != firsts[:-1]]]
+    counts = np.diff(np.r_[firsts, tok.size])
+    if counts[0] != 3:
+        raise ValueError("Header must be 'n m b'")
+    heads, counts = firsts[1:], counts[1:]
+    if heads.size != N:
+        raise ValueError(f"Expected {N} paper lines, found {heads.size}")
+    deg = tok[heads]
+    bad = np.flatnonzero(deg != counts - 1)
+    if bad.size:
+        i = int(bad[0])
+        raise ValueError(f"Paper {i + 1}: k = {deg[i]} but {counts[i] - 1} reviewers listed")
+
+    paper_ptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(deg, out=paper_ptr[1:])
+
+    mask = np.ones(tok.size, dtype=bool)
+    mask[:3] = False
+    mask[heads] = False
+    paper_rev = (tok[mask] - 1).astype(np.int32)
+    if paper_rev.size and (paper_rev.min() < 0 or paper_rev.max() >= M):
+        raise ValueError(f"Reviewer ID out of range 1..{M}")
+    return Instance(N, M, b, paper_ptr, paper_rev)
+
+
+def read_text(path: str) -> Instance:
+    with open(path, "rb") as f:
+        return parse_instance(f.read())
+
+
+def read_stdin() -> Instance:
+    return parse_instance(sys.stdin.buffer.read())
+
+
+# ---------- binary format ------------------------------------------
+#  header (64 byte): magic, version, flags, N, M, b, nnz
+#  body  (int32)   : paper_ptr[N+1] paper_rev[nnz] rev_ptr[M+1] rev_pap[nnz] rev_edge[nnz]
+#  flags & 1       : body nén bằng zlib (không mmap được, phải giải nén)
+BIN_EXT    = ".bin"
+BIN_MAGIC  = b"RAPB"
+BIN_HEADER = struct.Struct("<4sII4xqqqq")
+HEADER_SIZE = 64
+FLAG_ZLIB  = 1
+
+
+def _body_sizes(N: int, M: int, nnz: int) -> List[int]:
+    return [N + 1, nnz, M + 1, nnz, nnz]
+
+
+def write_binary(inst: Instance, path: str, compress: bool = False):
+    arrays = [inst.paper_ptr, inst.paper_rev, inst.rev_ptr, inst.rev_pap, inst.rev_edge]
+    body = b"".join(np.ascontiguousarray(a, dtype="<i4").tobytes() for a in arrays)
+    flags = 0
+    if compress:
+        body, flags = zlib.compress(body, 6), FLAG_ZLIB
+    header = BIN_HEADER.pack(BIN_MAGIC, 1, flags, inst.N, inst.M, inst.b, inst.nnz)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def read_binary(path: str) -> Instance:
+    """
+    Bản không nén được memory-map trực tiếp: các mảng CSR chỉ là view trên
+    trang của file, không copy, và các tiến trình cùng đọc một file dùng chung
+    page cache.
+    """
+    with open(path, "rb") as f:
+        magic, version, flags, N, M, b, nnz = BIN_HEADER.unpack(f.read(BIN_HEADER.size))
+        if magic != BIN_MAGIC or version != 1:
+            raise ValueError(f"{path}: not a binary instance file")
+        if flags & FLAG_ZLIB:
+            f.seek(HEADER_SIZE)
+            body = np.frombuffer(zlib.decompress(f.read()), dtype="<i4")
+        else:
+            body = None
+    if body is None:
+        body = np.memmap(path, dtype="<i4", mode="r", offset=HEADER_SIZE)
+
+    parts, pos = [], 0
+    for size in _body_sizes(N, M, nnz):
+        parts.append(body[pos:pos + size])
+        pos += size
+    if pos != body.size:
+        raise ValueError(f"{path}: truncated or corrupt body")
+    return Instance(N, M, b, *parts)
+
+
+def binary_path(path: str) -> str:
+    return os.path.splitext(path)[0] + BIN_EXT
+
+
+def convert(path: str, compress: bool = False) -> str:
+    out = binary_path(path)
+    write_binary(read_text(path), out, compress=compress)
+    return out
+
+
+def load_instance(path: str) -> Instance:
+    """
+    Đọc instance từ file .txt hoặc .bin. Với file .txt, nếu cạnh nó có bản
+    .bin mới hơn (tạo bởi `python instance.py`) thì dùng bản .bin, bỏ qua
+    bước parse.
+    """
+    if path.endswith(BIN_EXT):
+        return read_binary(path)
+    bin_path = binary_path(path)
+    if os.path.exists(bin_path) and os.path.getmtime(bin_path) >= os.path.getmtime(path):
+        return read_binary(bin_path)
+    return read_text(path)
+
+
+# ---------- converter ----------------------------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Chuyển instance .txt sang định dạng nhị phân .bin")
+    ap.add_argument("paths", nargs="+", help="file .txt hoặc thư mục chứa chúng")
+    ap.add_argument("-z", "--compress", action="store_true",
+                    help="nén zlib (nhỏ hơn nhưng không memory-map được)")
+    args = ap.parse_args()
+
+    files = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            files += sorted(os.path.join(p, f) for f in os.listdir(p) if f.endswith(".txt"))
+        else:
+            files.append(p)
+
+    for fname in files:
+        out = convert(fname, compress=args.compress)
+        print(f"{fname} → {out} ({os.path.getsize(fname)} → {os.path.getsize(out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
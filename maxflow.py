@@ -0,0 +1,225 @@
+import os, time
+from typing import List, Tuple
+
+import numpy as np
+
+from instance import Instance, load_instance
+from greedy import solve_greedy
+from bounds import lower_bound
+from results_store import record
+
+
+class FlowNetwork:
+    """
+    Mạng luồng của bài toán với tải tối đa z:
+        S → paper (cap b),  paper → reviewer (cap 1),  reviewer → T (cap z)
+
+    Cạnh e có cung xuôi 2e và cung ngược 2e+1 (a ^ 1 là cung đối của a).
+    Thứ tự cạnh: N cạnh S→paper, nnz cạnh paper→reviewer (cùng thứ tự với
+    inst.paper_rev), M cạnh reviewer→T. Đỉnh: S = 0, paper 1..N,
+    reviewer N+1..N+M, T = N+M+1.
+    """
+
+    def __init__(self, inst: Instance, base: np.ndarray = None):
+        N, M, nnz = inst.N, inst.M, inst.nnz
+        self.inst = inst
+        # tải cố định sẵn có: cạnh reviewer→T chỉ còn max(0, z - base[r])
+        self.base = [0] * M if base is None else np.asarray(base, dtype=np.int64).tolist()
+        self.n_nodes = N + M + 2
+        self.S, self.T = 0, N + M + 1
+        self.pr_base  = N                # cạnh paper→reviewer đầu tiên
+        self.rt_base  = N + nnz          # cạnh reviewer→T đầu tiên
+
+        papers = np.arange(1, N + 1, dtype=np.int64)
+        revs   = np.arange(N + 1, N + M + 1, dtype=np.int64)
+        tail = np.concatenate([np.zeros(N, np.int64), inst.edge_paper() + 1, revs])
+        head = np.concatenate([papers, inst.paper_rev.astype(np.int64) + N + 1,
+                               np.full(M, self.T, np.int64)])
+        n_edges = tail.size
+
+        frm = np.empty(2 * n_edges, np.int64)
+        to  = np.empty(2 * n_edges, np.int64)
+        frm[0::2], frm[1::2] = tail, head
+        to[0::2],  to[1::2]  = head, tail
+
+        cap = np.zeros(2 * n_edges, np.int64)
+        cap[0:2 * N:2] = inst.b
+        cap[2 * N:2 * self.rt_base:2] = 1
+
+        order = np.argsort(frm, kind="stable")
+        start = np.zeros(self.n_nodes + 1, np.int64)
+        np.cumsum(np.bincount(frm, minlength=self.n_nodes), out=start[1:])
+
+        # list thuần Python: truy cập phần tử nhanh hơn ndarray trong vòng lặp
+        self.frm   = frm.tolist()
+        self.to    = to.tolist()
+        self.arcs  = order.tolist()
+        self.start = start.tolist()
+        self.cap   = cap.tolist()       # dung lượng dư; cap[a ^ 1] là luồng trên a
+        self.z     = 0
+        self.flow  = 0
+
+    def copy(self) -> "FlowNetwork":
+        other = object.__new__(FlowNetwork)
+        other.__dict__.update(self.__dict__)
+        other.cap = self.cap[:]
+        return other
+
+    def raise_cap(self, z: int):
+        """Tăng tải tối đa lên z (cạnh reviewer→T: z - base); luồng hiện tại vẫn hợp lệ."""
+        if z < self.z:
+            raise ValueError("Load cap can only grow on a warm-started network")
+        cap, old = self.cap, self.z
+        for r, e in enumerate(range(self.rt_base, self.rt_base + self.inst.M)):
+            fixed = self.base[r]
+            cap[2 * e] += max(0, z - fixed) - max(0, old - fixed)
+        self.z = z
+
+    def max_flow(self) -> int:
+        """Dinic: BFS phân tầng + DFS lặp với con trỏ cung hiện tại."""
+        S, T, n = self.S, self.T, self.n_nodes
+        frm, to, arcs, start, cap = self.frm, self.to, self.arcs, self.start, self.cap
+        need = self.inst.N * self.inst.b
+
+        while self.flow < need:
+            level = [-1] * n
+            level[S] = 0
+            queue = [S]
+            for u in queue:
+                lu = level[u] + 1
+                for k in range(start[u], start[u + 1]):
+                    a = arcs[k]
+                    if cap[a] > 0 and level[to[a]] < 0:
+                        level[to[a]] = lu
+                        queue.append(to[a])
+            if level[T] < 0:
+                break
+
+            it = start[:-1]
+            path: List[int] = []
+            u = S
+            while True:
+                if u == T:
+                    d = min(cap[a] for a in path)
+                    cut = len(path)
+                    for k, a in enumerate(path):
+                        cap[a] -= d
+                        cap[a ^ 1] += d
+                        if cap[a] == 0 and k < cut:
+                            cut = k
+                    self.flow += d
+                    del path[cut:]
+                    u = to[path[-1]] if path else S
+                    continue
+
+                k, end, want = it[u], start[u + 1], level[u] + 1
+                while k < end:
+                    a = arcs[k]
+                    if cap[a] > 0 and level[to[a]] == want:
+                        break
+                    k += 1
+                it[u] = k
+                if k < end:
+                    path.append(arcs[k])
+                    u = to[arcs[k]]
+                    continue
+
+                # ngõ cụt: loại u khỏi đồ thị tầng rồi lùi lại
+                if u == S:
+                    break
+                level[u] = -1
+                a = path.pop()
+                u = frm[a]
+                it[u] += 1
+        return self.flow
+
+    def assignment(self) -> np.ndarray:
+        """Ma trận (N, b) reviewer (0-based) được gán cho từng paper."""
+        inst = self.inst
+        base = 2 * self.pr_base + 1
+        used = np.array(self.cap[base:base + 2 * inst.nnz:2], dtype=np.int64) > 0
+        return inst.paper_rev[used].reshape(inst.N, inst.b)
+
+
+def greedy_upper_bound(inst: Instance, base: np.ndarray = None) -> int:
+    return solve_greedy(inst, base=base)[0]
+
+
+def solve_maxflow(inst: Instance, base: np.ndarray = None) -> Tuple[int, np.ndarray]:
+    """
+    Tìm z nhỏ nhất sao cho mạng luồng đạt N*b bằng tìm kiếm nhị phân trên
+    [lower_bound, greedy]. Luồng của giá trị z lớn nhất đã biết là không khả thi
+    được giữ lại làm điểm xuất phát cho các lần thử sau, vì nó vẫn hợp lệ khi
+    tăng z. base: tải cố định sẵn có của từng reviewer, tính cả vào z.
+    """
+    N, b = inst.N, inst.b
+    offset = base
+    fixed  = int(np.max(offset, initial=0)) if offset is not None else 0
+    if N == 0:
+        return fixed, np.zeros((0, b), dtype=np.int32)
+    if inst.paper_deg().min() < b:
+        raise ValueError("Some paper has fewer than b eligible reviewers")
+
+    lo = max(lower_bound(inst), fixed) - 1          # lo: luôn không khả thi
+    hi = greedy_upper_bound(inst, offset)           # hi: luôn khả thi
+    base = FlowNetwork(inst, offset)
+    base.raise_cap(lo)
+    best = None
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        net = base.copy()
+        net.raise_cap(mid)
+        if net.max_flow() == N * b:
+            hi, best = mid, net
+        else:
+            lo, base = mid, net
+
+    if best is None:
+        base.raise_cap(hi)
+        base.max_flow()
+        best = base
+    return hi, best.assignment()
+
+
+# ---------- I/O ----------------------------------------------------
+def write_result(out_path, n, m, obj, runtime_ms):
+    with open(out_path, "w") as f:
+        f.write(f"{os.path.basename(out_path)}\n")
+        f.write(f"n = {n}\n")
+        f.write(f"m = {m}\n")
+        f.write(f"Objective Value: {obj} OPTIMAL\n")
+        f.write(f"{runtime_ms} ms\n")
+
+
+def run_instance(in_path, out_path, store_assignment=False):
+    inst = load_instance(in_path)
+
+    start, cpu = time.time(), time.process_time()
+    obj, assign = solve_maxflow(inst)
+    runtime = int((time.time() - start) * 1000)
+    cpu_ms  = int((time.process_time() - cpu) * 1000)
+
+    write_result(out_path, inst.N, inst.M, obj, runtime)
+    record(out_path, "MaxFlow", in_path, inst, obj, "OPTIMAL", runtime, cpu_ms,
+           assignment=assign if store_assignment else None)
+
+# ---------- batch runner -------------------------------------------
+def main():
+    root = os.getcwd()
+    inst_dir = os.path.join(root, "instances")
+    res_dir  = os.path.join(root, "results")
+    os.makedirs(res_dir, exist_ok=True)
+
+    files = [f for f in os.listdir(inst_dir) if f.endswith(".txt")]
+
+    for fname in files:
+        in_path  = os.path.join(inst_dir, fname)
+        out_name = f"[MaxFlow] {fname}"
+        out_path = os.path.join(res_dir, out_name)
+
+        print(f"Đang xử lý: {fname} → {out_name}")
+        run_instance(in_path, out_path)
+
+if __name__ == "__main__":
+    main()
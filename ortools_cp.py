@@ -1,125 +1,143 @@
-import sys, random
-from collections import Counter
-
-# ------------------------- đọc dữ liệu -------------------------
-def read_instance():
-    N, M, b = map(int, sys.stdin.readline().split())
-    L = []
-    for _ in range(N):
-        tokens = list(map(int, sys.stdin.readline().split()))
-        k, reviewers = tokens[0], tokens[1:]
-        assert len(reviewers) == k
-        L.append(reviewers)
-    return N, M, b, L
-
-# ----------------- các hàm tiện ích cho nghiệm -----------------
-def max_load(loads):
-    return max(loads.values()) if loads else 0
-
-def add_assignment(sol, loads, paper_idx, reviewers):
-    sol[paper_idx] = reviewers[:]
-    for r in reviewers:
-        loads[r] += 1
-
-def remove_assignment(sol, loads, paper_idx):
-    for r in sol[paper_idx]:
-        loads[r] -= 1
-    sol[paper_idx].clear()
-
-# -------------- khởi tạo – greedy tải thấp nhất -----------------
-def initial_solution(N, b, L):
-    sol = [[] for _ in range(N)]
-    loads = Counter()
+import os
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from instance import load_instance
+from bounds import lower_bound
+from greedy import warm_start
+from results_store import Progress, record
+
+
+def build_model(inst, lb, hint=None, base=None):
+    """
+    Mô hình CP-SAT: x_e ∈ {0,1} cho mỗi cạnh (paper, reviewer) hợp lệ theo
+    thứ tự CSR, mỗi paper đúng b reviewer, tải mỗi reviewer ≤ z, cực tiểu z.
+    Miền của z là [lb, tải của nghiệm gợi ý] nên solver không phải tự chứng
+    minh lại cận dưới hay tìm lại cận trên. hint = warm_start(inst, base);
+    base: tải cố định sẵn có của từng reviewer. Trả về (model, x).
+    """
+    N, M, b, nnz = inst.N, inst.M, inst.b, inst.nnz
+    fixed = [0] * M if base is None else np.asarray(base, dtype=np.int64).tolist()
+    model = cp_model.CpModel()
+    x = [model.NewBoolVar(f"x{e}") for e in range(nnz)]
+    ub = hint[0] if hint is not None else N + max(fixed, default=0)
+    z = model.NewIntVar(lb, max(lb, ub), "max_load")
+
+    paper_ptr = inst.paper_ptr.tolist()
     for i in range(N):
-        cand = sorted(L[i], key=lambda r: loads[r])
-        add_assignment(sol, loads, i, cand[:b])
-    return sol, loads
-
-# -------------- Các operator phá huỷ / xây lại ------------------
-def random_destroy(sol, loads, ratio):
-    N = len(sol)
-    k = max(1, int(N * ratio))
-    removed = random.sample(range(N), k)
-    for i in removed:
-        remove_assignment(sol, loads, i)
-    return removed
-
-def worst_load_destroy(sol, loads, ratio):
-    N = len(sol)
-    k = max(1, int(N * ratio))
-    idx = sorted(range(N),
-                 key=lambda i: sum(loads[r] for r in sol[i]),
-                 reverse=True)[:k]
-    for i in idx:
-        remove_assignment(sol, loads, i)
-    return idx
-
-def greedy_repair(sol, loads, removed, b, L):
-    for i in removed:
-        cand = sorted(L[i], key=lambda r: loads[r])
-        add_assignment(sol, loads, i, cand[:b])
-
-def random_repair(sol, loads, removed, b, L):
-    for i in removed:
-        cand = L[i][:]
-        random.shuffle(cand)
-        add_assignment(sol, loads, i, cand[:b])
-
-# ------------- Chọn operator bằng roulette-wheel ----------------
-def choose(ops, weights):
-    return random.choices(range(len(ops)), weights=weights, k=1)[0]
-
-# ------------- Cập nhật trọng số thích nghi ---------------------
-def update_weights(weights, idx, reward, decay=0.9):
-    for i in range(len(weights)):
-        if i == idx:
-            weights[i] = decay * weights[i] + reward
+        xs = x[paper_ptr[i]:paper_ptr[i + 1]]
+        if b == 1:
+            model.AddExactlyOne(xs)
         else:
-            weights[i] = decay * weights[i]
-
-# ------------- Thuật toán ALNS không dùng SA -------------------
-def alns(N, M, b, L, max_iter=1000, seed=0):
-    random.seed(seed)
-    destroy_ops = [random_destroy, worst_load_destroy]
-    repair_ops  = [greedy_repair, random_repair]
-    dw, rw = [1.0]*len(destroy_ops), [1.0]*len(repair_ops)
-
-    current, loads = initial_solution(N, b, L)
-    best     = [r[:] for r in current]
-    best_val = max_load(loads)
-
-    for _ in range(max_iter):
-        # --- chọn operator ---
-        didx = choose(destroy_ops, dw)
-        ridx = choose(repair_ops,  rw)
-
-        # --- sao lưu ---
-        saved_sol  = [r[:] for r in current]
-        saved_load = loads.copy()
-
-        # --- áp dụng ---
-        removed = destroy_ops[didx](current, loads, ratio=0.15)
-        repair_ops[ridx](current, loads, removed, b, L)
-        val = max_load(loads)
-
-        # --- chỉ nhận nếu tốt hơn ---
-        if val < best_val:
-            best_val = val
-            best = [r[:] for r in current]
-            update_weights(dw, didx, reward=2)
-            update_weights(rw, ridx, reward=2)
-        else:
-            current, loads = saved_sol, saved_load
-            update_weights(dw, didx, reward=0.1)
-            update_weights(rw, ridx, reward=0.1)
+            model.Add(cp_model.LinearExpr.Sum(xs) == b)
+
+    rev_ptr, rev_edge = inst.rev_ptr.tolist(), inst.rev_edge.tolist()
+    for r in range(M):
+        edges = rev_edge[rev_ptr[r]:rev_ptr[r + 1]]
+        if edges:
+            model.Add(cp_model.LinearExpr.Sum([x[e] for e in edges]) + fixed[r] <= z)
+    model.Minimize(z)
+
+    if hint is not None:
+        on = hint[1].tolist()
+        for e in range(nnz):
+            model.AddHint(x[e], on[e])
+        model.AddHint(z, hint[0])
+    return model, x
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """Ghi mỗi nghiệm mới của CP-SAT vào Progress; dừng tìm kiếm khi gap đứng yên."""
+
+    def __init__(self, progress):
+        super().__init__()
+        self.progress = progress
+
+    def on_solution_callback(self):
+        if self.progress.log(self.ObjectiveValue(), self.BestObjectiveBound()):
+            self.StopSearch()
+
+
+def solve_cp(inst, time_limit_s=600.0, workers=None, progress=None, base=None):
+    """
+    Trả về (objective, status, chosen) với chosen là mảng bool theo thứ tự
+    cạnh CSR (cạnh nào được chọn). Greedy cho nghiệm gợi ý và cận trên; nếu
+    nó đã chạm lb thì không cần gọi CP-SAT. progress (results_store.Progress)
+    nhận (incumbent, cận) mỗi khi có nghiệm hoặc cận mới. base: tải cố định
+    sẵn có của từng reviewer, tính cả vào objective.
+    """
+    lb = lower_bound(inst)
+    if base is not None:
+        lb = max(lb, int(np.max(base, initial=0)))
+    hint = warm_start(inst, base)
+    if progress is not None:
+        progress.log(hint[0], lb)
+    if hint[0] <= lb:
+        return hint[0], "OPTIMAL", hint[1]
+
+    model, x = build_model(inst, lb, hint, base)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit_s
+    solver.parameters.num_search_workers = workers or os.cpu_count() or 1
+    callback = None
+    if progress is not None:
+        callback = ProgressCallback(progress)
+        if hasattr(solver, "best_bound_callback"):      # OR-Tools ≥ 9.8
+            def on_bound(bound):
+                if progress.log(progress.last[0], bound):
+                    solver.StopSearch()
+            solver.best_bound_callback = on_bound
+    status = solver.Solve(model, callback)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        # hết giờ trước khi có nghiệm: nghiệm greedy vẫn hợp lệ
+        return hint[0], "FEASIBLE", hint[1]
+    if progress is not None:
+        progress.log(solver.ObjectiveValue(), solver.BestObjectiveBound())
+    chosen = np.array([solver.BooleanValue(v) for v in x], dtype=bool)
+    return (int(solver.ObjectiveValue()),
+            "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE", chosen)
+
+
+def write_result(out_path, n, m, obj, runtime_ms, status="FEASIBLE"):
+    with open(out_path, "w") as f:
+        f.write(f"{os.path.basename(out_path)}\n")
+        f.write(f"n = {n}\n")
+        f.write(f"m = {m}\n")
+        f.write(f"Objective Value: {obj} {status}\n")
+        f.write(f"{runtime_ms} ms\n")
+
+
+def run_instance(in_path, out_path, time_limit_s=600.0, workers=None, stall_s=None):
+    inst = load_instance(in_path)
+    start, cpu = time.time(), time.process_time()
+    progress = Progress(out_path, "CP_Ortools", in_path, inst, stall_s=stall_s)
+    obj, status, _ = solve_cp(inst, time_limit_s=time_limit_s, workers=workers, progress=progress)
+    runtime_ms = int((time.time() - start) * 1000)
+    cpu_ms     = int((time.process_time() - cpu) * 1000)
+
+    write_result(out_path, inst.N, inst.M, obj, runtime_ms, status)
+    record(out_path, "CP_Ortools", in_path, inst, obj, status, runtime_ms, cpu_ms,
+           params={"time_limit_s": time_limit_s, "workers": workers or os.cpu_count(),
+                   "stall_s": stall_s},
+           run=progress.run)
+
+
+def main():
+    root     = os.getcwd()
+    inst_dir = os.path.join(root, "instances")
+    res_dir  = os.path.join(root, "results")
+    os.makedirs(res_dir, exist_ok=True)
+
+    files = [f for f in os.listdir(inst_dir) if f.endswith(".txt")]
+
+    for fname in files:
+        in_path  = os.path.join(inst_dir, fname)
+        out_name = f"[CP_Ortools] {fname}"
+        out_path = os.path.join(res_dir, out_name)
+
+        print(f"Đang xử lý: {fname} → {out_name}")
+        run_instance(in_path, out_path)
 
-    return best
 
-# --------------------------- main -------------------------------
 if __name__ == "__main__":
-    N, M, b, L = read_instance()
-    solution = alns(N, M, b, L, max_iter=1000, seed=42)
-
-    print(N)
-    for reviewers in solution:
-        print(b, *reviewers)
+    main()
@@ -0,0 +1,312 @@
+import os, time, argparse
+import multiprocessing as mp
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from instance import Instance, load_instance
+from bounds import lower_bound
+from results_store import record
+
+
+class Decomposition(NamedTuple):
+    lb: int                 # cận dưới của cả instance
+    bottleneck: np.ndarray  # bool theo reviewer: bậc > lb, có thể là nút cổ chai
+    forced: np.ndarray      # bool theo paper: đúng b reviewer hợp lệ, gán cứng (không free)
+    free: np.ndarray        # bool theo paper: mọi reviewer đều không là nút cổ chai
+    base: np.ndarray        # tải cố định của từng reviewer do các paper forced
+    label: np.ndarray       # nhãn thành phần liên thông của paper (-1 nếu free/forced)
+    components: List[np.ndarray]  # paper của từng thành phần, lớn trước
+
+
+def _components(inst: Instance, bottleneck: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """
+    Nhãn thành phần liên thông của các paper `active` khi chỉ nối qua reviewer
+    `bottleneck`: lan truyền nhãn nhỏ nhất qua reviewer, móc gốc vào nhãn mới
+    và nhảy con trỏ cho tới khi ổn định (số vòng ~ log đường kính).
+    """
+    N = inst.N
+    label = np.arange(N, dtype=np.int64)
+    rdeg = inst.rev_deg()
+    act = np.flatnonzero(bottleneck & (rdeg > 0))
+    if not act.size:
+        return label
+    lens = rdeg[act]
+    starts = np.zeros(act.size, dtype=np.int64)
+    np.cumsum(lens[:-1], out=starts[1:])
+    idx = np.arange(int(lens.sum()), dtype=np.int64) + np.repeat(inst.rev_ptr[act] - starts, lens)
+    pap = inst.rev_pap[idx].astype(np.int64)
+    rid = np.repeat(act, lens)
+    keep = active[pap]
+    pap, rid = pap[keep], rid[keep]
+    if not pap.size:
+        return label
+    starts = np.flatnonzero(np.r_[True, rid[1:] != rid[:-1]])
+    lens = np.diff(np.r_[starts, pap.size])
+    # cùng các cạnh đó theo thứ tự paper để lấy min trên reviewer của mỗi paper
+    order = np.argsort(pap, kind="stable")
+    sp = pap[order]
+    heads = np.flatnonzero(np.r_[True, sp[1:] != sp[:-1]])
+    has = sp[heads]
+
+    while True:
+        rmin = np.minimum.reduceat(label[pap], starts)
+        pmin = np.minimum.reduceat(np.repeat(rmin, lens)[order], heads)
+        new = label.copy()
+        new[has] = np.minimum(label[has], pmin)
+        np.minimum.at(new, label, new)      # gốc cũ nhận nhãn nhỏ nhất của các thành viên
+        while True:
+            jumped = new[new]
+            if np.array_equal(jumped, new):
+                break
+            new = jumped
+        if np.array_equal(new, label):
+            return label
+        label = new
+
+
+def decompose(inst: Instance, lb: int = None, fix_forced: bool = True) -> Decomposition:
+    """
+    Rút gọn rồi tách instance:
+      * reviewer có bậc ≤ lb không bao giờ làm tải tối đa vượt lb nên không
+        nối các paper với nhau (ràng buộc tải của nó không thể chặt);
+      * paper chỉ có reviewer như vậy (free) được gán thẳng, không cần giải;
+      * paper có đúng b reviewer (forced) bị gán cứng: tải của chúng thành
+        tải cố định `base` của reviewer và chúng không nối các paper khác.
+        fix_forced=False giữ chúng trong thành phần (cho backend không nhận
+        được tải cố định).
+    Các paper còn lại chia theo thành phần liên thông, giải độc lập được.
+    """
+    lb = lower_bound(inst) if lb is None else lb
+    bottleneck = inst.rev_deg() > lb
+    pdeg = inst.paper_deg()
+    hits = np.add.reduceat(bottleneck[inst.paper_rev].astype(np.int64), inst.paper_ptr[:-1]) \
+        if inst.nnz else np.zeros(inst.N, dtype=np.int64)
+    free = (hits == 0) | (pdeg == 0)
+    forced = (pdeg == inst.b) & ~free if fix_forced else np.zeros(inst.N, dtype=bool)
+    base = np.bincount(inst.paper_rev[np.repeat(forced, pdeg)], minlength=inst.M)
+
+    active = ~free & ~forced
+    label = _components(inst, bottleneck, active)
+    label[~active] = -1
+
+    order = np.argsort(label, kind="stable")
+    order = order[label[order] >= 0]
+    cuts = np.flatnonzero(np.diff(label[order])) + 1
+    comps = sorted(np.split(order, cuts) if order.size else [], key=len, reverse=True)
+    return Decomposition(lb, bottleneck, forced, free, base, label, comps)
+
+
+class Budget(NamedTuple):
+    threads: int = 1                    # số luồng solver được dùng cho một thành phần
+    seed: int = 42                      # seed của heuristic ngẫu nhiên cho thành phần này
+    time_limit: Optional[float] = None  # giây dành cho thành phần (None = không giới hạn)
+
+
+def sub_instance(inst: Instance, papers: np.ndarray) -> Tuple[Instance, np.ndarray]:
+    """Instance con gồm các paper cho trước; trả về kèm ID reviewer gốc của nó."""
+    ptr = inst.paper_ptr
+    lens = ptr[papers + 1] - ptr[papers]
+    starts = np.zeros(papers.size, dtype=np.int64)
+    np.cumsum(lens[:-1], out=starts[1:])
+    idx = np.arange(int(lens.sum()), dtype=np.int64) + np.repeat(ptr[papers] - starts, lens)
+    revs, local = np.unique(inst.paper_rev[idx], return_inverse=True)
+    sub_ptr = np.zeros(papers.size + 1, dtype=ptr.dtype)
+    np.cumsum(lens, out=sub_ptr[1:])
+    sub = Instance(int(papers.size), int(revs.size), inst.b, sub_ptr,
+                   local.astype(inst.paper_rev.dtype))
+    return sub, revs
+
+
+# ---------- backends: (inst, base, Budget) -> (objective, phân công (N, b) 0-based, tối ưu?) ----
+def _chosen(inst, mask):
+    """Mảng bool theo thứ tự cạnh CSR -> phân công (N, b)."""
+    return inst.paper_rev[mask].reshape(inst.N, inst.b)
+
+
+def _solve_greedy(inst, base, budget):
+    from greedy import solve_greedy
+    return (*solve_greedy(inst, base=base), False)
+
+
+def _solve_maxflow(inst, base, budget):
+    from maxflow import solve_maxflow
+    return (*solve_maxflow(inst, base), True)
+
+
+def _solve_cp(inst, base, budget):
+    from ortools_cp import solve_cp
+    obj, status, mask = solve_cp(inst, time_limit_s=budget.time_limit,
+                                 workers=budget.threads, base=base)
+    return obj, _chosen(inst, mask), status == "OPTIMAL"
+
+
+def _solve_scip(inst, base, budget):
+    from pywraplp import solve_scip
+    obj, status, mask, _, _ = solve_scip(inst, int(budget.time_limit * 1000), base=base)
+    if status == "ERROR":
+        raise RuntimeError("SCIP is not available in this OR-Tools build")
+    return obj, _chosen(inst, mask), status == "OPTIMAL"
+
+
+def _solve_gurobi(inst, base, budget):
+    from greedy import warm_start
+    from gurobi import solve_model
+    lb = max(lower_bound(inst), int(np.max(base, initial=0)))
+    hint = warm_start(inst, base)
+    if hint[0] <= lb:
+        return hint[0], _chosen(inst, hint[1]), True
+    obj, status, mask = solve_model(inst.N, inst.M, inst.b, inst.to_lists(),
+                                    lb=lb, hint=hint, base=base, threads=budget.threads,
+                                    time_limit=budget.time_limit)
+    if obj is None:                         # không có nghiệm: nghiệm greedy vẫn hợp lệ
+        return hint[0], _chosen(inst, hint[1]), False
+    return obj, _chosen(inst, mask), status == "OPTIMAL"
+
+
+def _solve_hcls(inst, base, budget):
+    import random
+    from HCLS import LocalSearch
+    random.seed(budget.seed)                # LocalSearch dùng random toàn cục
+    L = dict(enumerate(inst.to_lists(one_based=True), start=1))
+    sol, loads = LocalSearch(inst.N, inst.M, inst.b, lower_bound(inst)).solve(L)
+    return max(loads, default=0), np.asarray(sol, dtype=np.int32).reshape(inst.N, inst.b) - 1, False
+
+
+def _solve_alns(inst, base, budget):
+    from ALNS import alns
+    state = alns(inst.N, inst.M, inst.b, inst.to_lists(one_based=True), seed=budget.seed,
+                 lb=lower_bound(inst), time_limit=budget.time_limit)
+    return state.max, np.asarray(state.sol, dtype=np.int32).reshape(inst.N, inst.b) - 1, False
+
+
+# tên -> (hàm, nhận tải cố định base?, tổng thời gian mặc định (giây) hoặc None
+# nếu backend không giới hạn thời gian); heuristic list-based không nhận base
+# nên với chúng paper forced vẫn nằm trong thành phần
+BACKENDS: Dict[str, Tuple[Callable, bool, Optional[float]]] = {
+    "greedy":  (_solve_greedy,  True,  None),
+    "maxflow": (_solve_maxflow, True,  None),
+    "cp":      (_solve_cp,      True,  600.0),
+    "scip":    (_solve_scip,    True,  600.0),
+    "gurobi":  (_solve_gurobi,  True,  None),
+    "hcls":    (_solve_hcls,    False, None),
+    "alns":    (_solve_alns,    False, 10.0),
+}
+
+
+def _solve_component(job):
+    backend, sub, papers, revs, base, budget = job
+    _, A, optimal = BACKENDS[backend][0](sub, base, budget)
+    return papers, revs[A], optimal
+
+
+def solve_decomposed(inst: Instance, backend: str = "maxflow", workers: int = None,
+                     seed: int = 42, time_limit: Optional[float] = None
+                     ) -> Tuple[int, np.ndarray, Decomposition, bool]:
+    """
+    Giải từng thành phần bằng `backend` (song song trên `workers` tiến trình,
+    mặc định số CPU; số CPU được chia đều cho các tiến trình, nên solver đa
+    luồng như CP-SAT không chạy cores² luồng) rồi ghép phân công về ID gốc.
+    time_limit là tổng thời gian (giây, mặc định theo backend) cho cả
+    instance, chia cho các thành phần theo số cạnh; thành phần thứ k dùng
+    seed + k, nên kết quả tái lập được dù thứ tự chạy trong pool thay đổi. Trả về (objective, phân
+    công, Decomposition, tối ưu?): tối ưu khi objective chạm lb hoặc mọi
+    thành phần được giải tối ưu — thành phần chỉ chia sẻ reviewer có bậc ≤ lb
+    và tải của paper forced là cố định trong mọi nghiệm.
+    """
+    solve, takes_base, default_limit = BACKENDS[backend]
+    time_limit = default_limit if time_limit is None else time_limit
+    workers = workers or os.cpu_count() or 1
+    if mp.current_process().daemon:         # đã ở trong một pool: không mở thêm tiến trình
+        workers = 1
+    dec = decompose(inst, fix_forced=takes_base)
+    if len(dec.components) == 1 and len(dec.components[0]) == inst.N:
+        # không tách / rút gọn được: giải thẳng, khỏi sao chép
+        obj, A, optimal = solve(inst, None, Budget(workers, seed, time_limit))
+        return obj, A, dec, optimal or obj <= dec.lb
+
+    A = np.empty((inst.N, inst.b), dtype=np.int32)
+    for i in np.flatnonzero(dec.free):      # free: b reviewer đầu tiên là đủ
+        A[i] = inst.candidates(i)[:inst.b]
+    for i in np.flatnonzero(dec.forced):    # forced: nhận tất cả reviewer hợp lệ
+        A[i] = inst.candidates(i)
+
+    procs   = min(workers, len(dec.components)) or 1
+    threads = max(1, workers // procs)
+    subs    = [sub_instance(inst, papers) for papers in dec.components]
+    total   = sum(sub.nnz for sub, _ in subs) or 1
+    jobs = []
+    for k, (papers, (sub, revs)) in enumerate(zip(dec.components, subs)):
+        # procs tiến trình chạy song song: tổng phần chia ≈ procs * time_limit,
+        # mỗi thành phần không quá time_limit
+        share = None if time_limit is None else min(time_limit, time_limit * procs * sub.nnz / total)
+        jobs.append((backend, sub, papers, revs, dec.base[revs] if takes_base else None,
+                     Budget(threads, seed + k, share)))
+
+    if procs > 1:
+        with mp.Pool(procs) as pool:
+            results = list(pool.imap_unordered(_solve_component, jobs))
+    else:
+        results = [_solve_component(job) for job in jobs]
+    optimal = True
+    for papers, sub_A, opt in results:
+        A[papers] = sub_A
+        optimal &= opt
+
+    loads = np.bincount(A.ravel(), minlength=inst.M) if inst.N else np.zeros(inst.M, dtype=np.int64)
+    obj = int(loads.max(initial=0))
+    return obj, A, dec, optimal or obj <= dec.lb
+
+
+# ---------- I/O ----------------------------------------------------
+def write_result(out_path, n, m, obj, runtime_ms, status="FEASIBLE"):
+    with open(out_path, "w") as f:
+        f.write(f"{os.path.basename(out_path)}\n")
+        f.write(f"n = {n}\n")
+        f.write(f"m = {m}\n")
+        f.write(f"Objective Value: {obj} {status}\n")
+        f.write(f"{runtime_ms} ms\n")
+
+
+def run_instance(in_path, out_path, backend="maxflow", workers=None, seed=42, time_limit=None,
+                 store_assignment=False):
+    inst = load_instance(in_path)
+
+    start, cpu = time.time(), time.process_time()
+    obj, A, dec, optimal = solve_decomposed(inst, backend=backend, workers=workers,
+                                            seed=seed, time_limit=time_limit)
+    runtime = int((time.time() - start) * 1000)
+    cpu_ms  = int((time.process_time() - cpu) * 1000)
+
+    status = "OPTIMAL" if optimal else "FEASIBLE"
+    write_result(out_path, inst.N, inst.M, obj, runtime, status)
+    record(out_path, "Decomposed", in_path, inst, obj, status, runtime, cpu_ms,
+           seed=seed, params={"backend": backend, "workers": workers or os.cpu_count(),
+                              "time_limit": time_limit},
+           assignment=A if store_assignment else None,
+           components=len(dec.components),
+           largest=int(len(dec.components[0])) if dec.components else 0,
+           free_papers=int(dec.free.sum()), forced_papers=int(dec.forced.sum()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rút gọn, tách thành phần liên thông và giải song song")
+    ap.add_argument("instances", nargs="+")
+    ap.add_argument("--backend", choices=list(BACKENDS), default="maxflow")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--time-limit", type=float, default=None,
+                    help="tổng số giây cho cả instance, chia cho các thành phần (mặc định theo backend)")
+    ap.add_argument("--results", default="results")
+    args = ap.parse_args()
+
+    os.makedirs(args.results, exist_ok=True)
+    for in_path in args.instances:
+        out_path = os.path.join(args.results, f"[Decomposed] {os.path.basename(in_path)}")
+        run_instance(in_path, out_path, backend=args.backend, workers=args.workers,
+                     seed=args.seed, time_limit=args.time_limit)
+        print(f"{os.path.basename(in_path)} → {out_path}")
+
+
+if __name__ == "__main__":
+    main()
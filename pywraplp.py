@@ -1,62 +1,216 @@
-from ortools.linear_solver import pywraplp
+from ortools.linear_solver import pywraplp, linear_solver_pb2
 import os
+import re
+import sys
+import math
 import time
+import tempfile
+import numpy as np
+from contextlib import contextmanager
+from instance import load_instance
+from bounds import lower_bound
+from greedy import warm_start
+from results_store import Progress, record
 
 def InputFile(filename):
     """Đọc dữ liệu từ file và điều chỉnh chỉ số reviewer về dạng 0-based."""
-    with open(filename, 'r') as f:
-        n, m, b = map(int, f.readline().split())
-        paper_preferences = []
-        for _ in range(n):
-            parts = list(map(int, f.readline().split()))
-            reviewers = [r - 1 for r in parts[1:]]  # Chuyển về chỉ số 0-based
-            paper_preferences.append(reviewers)
-        return n, m, b, paper_preferences
-
-def solve_reviewers_assignment_ilp(n, m, b, paper_prefs, output_file):
-    """Giải bài toán phân công reviewer và ghi kết quả vào file output."""
-    solver = pywraplp.Solver.CreateSolver('SCIP')
-    if not solver:
-        return
-    solver.set_time_limit(600000)
-    # Khai báo biến chỉ cho các cặp (paper, reviewer) hợp lệ
-    x = {}
-    reviewer_papers = [[] for _ in range(m)]
-    for i in range(n):
-        for r in paper_prefs[i]:
-            x[i, r] = solver.IntVar(0, 1, f'x_{i}_{r}')
-            reviewer_papers[r].append(i)
+    inst = load_instance(filename)
+    return inst.N, inst.M, inst.b, inst.to_lists()  # chỉ số 0-based
 
-    # Biến tải tối đa
-    max_load = solver.IntVar(0, n, 'max_load')
+def build_model(inst, lb=0, hint=None, base=None):
+    """
+    MPModelProto dựng thẳng từ mảng CSR, không tạo IntVar / biểu thức Python:
+      biến e (0 ≤ e < nnz) = x cho cạnh thứ e của paper_rev, biến nnz = max_load
+      N ràng buộc  sum_{e ∈ paper i} x_e = b
+      M ràng buộc  max_load - sum_{e ∈ reviewer r} x_e ≥ base[r]
+    (base: tải cố định sẵn có của từng reviewer, mặc định 0).
+    nnz biến nhị phân giống hệt nhau nên được ghép bằng cách lặp bản mã hoá
+    của một biến (các phần tử lặp của protobuf nối tiếp nhau khi merge).
 
-    # Ràng buộc: mỗi paper có đúng b reviewer
+    hint = warm_start(inst, base): nghiệm greedy làm MIP start, và max_load
+    bị giới hạn trong [lb, objective của greedy].
+    """
+    n, m, b, nnz = inst.N, inst.M, inst.b, inst.nnz
+    fixed = [0] * m if base is None else np.asarray(base, dtype=np.int64).tolist()
+    model = linear_solver_pb2.MPModelProto()
+    one = linear_solver_pb2.MPModelProto()
+    one.variable.add(lower_bound=0, upper_bound=1, is_integer=True)
+    model.MergeFromString(one.SerializeToString() * nnz)
+    model.variable.add(lower_bound=lb, upper_bound=max(lb, hint[0]) if hint else n + max(fixed, default=0),
+                       is_integer=True, objective_coefficient=1, name="max_load")
+    if hint is not None:
+        model.solution_hint.var_index.extend(range(nnz + 1))
+        model.solution_hint.var_value.extend(hint[1].astype(float).tolist())
+        model.solution_hint.var_value.append(float(hint[0]))
+
+    paper_ptr = inst.paper_ptr.tolist()
     for i in range(n):
-        solver.Add(sum(x[i, r] for r in paper_prefs[i]) == b)
+        lo, hi = paper_ptr[i], paper_ptr[i + 1]
+        ct = model.constraint.add(lower_bound=b, upper_bound=b)
+        ct.var_index.extend(range(lo, hi))
+        ct.coefficient.extend([1.0] * (hi - lo))
 
-    # Ràng buộc: max_load >= tải của mỗi reviewer
+    rev_ptr, rev_edge = inst.rev_ptr.tolist(), inst.rev_edge.tolist()
     for r in range(m):
-        if reviewer_papers[r]:
-            solver.Add(max_load >= sum(x[i, r] for i in reviewer_papers[r]))
+        lo, hi = rev_ptr[r], rev_ptr[r + 1]
+        if lo == hi:
+            continue
+        ct = model.constraint.add(lower_bound=fixed[r], upper_bound=math.inf)
+        ct.var_index.extend(rev_edge[lo:hi])
+        ct.var_index.append(nnz)
+        ct.coefficient.extend([-1.0] * (hi - lo))
+        ct.coefficient.append(1.0)
+    return model
+
+@contextmanager
+def capture_stdout(path):
+    """Chuyển fd 1 (nơi SCIP in log) vào file path trong lúc chạy khối with."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(fd, 1)
+    os.close(fd)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+SCIP_TIME = re.compile(r"^\D?\s*(\d+(?:\.\d+)?)([smhd])$")
+SCIP_UNIT = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def scip_progress(log_text):
+    """
+    Đọc bảng tiến trình SCIP (cột time | ... | dualbound | primalbound | gap)
+    thành danh sách (giây, incumbent, cận); vị trí cột lấy theo dòng tiêu đề.
+    """
+    points, cols = [], None
+    for line in log_text.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if "dualbound" in fields and "primalbound" in fields:
+            cols = fields.index("dualbound"), fields.index("primalbound")
+            continue
+        t = SCIP_TIME.match(fields[0]) if cols and len(fields) > max(cols) else None
+        if not t:
+            continue
+        def num(x):
+            try:
+                return float(x)
+            except ValueError:
+                return None             # "--": chưa có nghiệm / cận
+        points.append((float(t.group(1)) * SCIP_UNIT[t.group(2)],
+                       num(fields[cols[1]]), num(fields[cols[0]])))
+    return points
 
-    # Mục tiêu: tối thiểu hóa tải tối đa
-    solver.Minimize(max_load)
+def solve_scip(inst, time_limit_ms=600000, progress=None, stall_nodes=None, base=None):
+    """
+    Giải bằng SCIP, trả về (objective, status, chosen, build_ms, solve_ms):
+    chosen là mảng bool theo thứ tự cạnh CSR; thời gian chuẩn bị (cận dưới,
+    nghiệm greedy làm MIP start, dựng mô hình) tính riêng với thời gian SCIP
+    giải. base: tải cố định sẵn có của từng reviewer, tính cả vào objective.
+
+    pywraplp không có callback Python cho SCIP, nên khi có progress
+    (results_store.Progress) log SCIP được bắt vào file tạm rồi chuyển thành
+    các điểm (incumbent, cận) sau khi giải. Dừng sớm dùng giới hạn gốc của
+    SCIP: stall_nodes nút liên tiếp không cải thiện nghiệm.
+    """
+    t0 = time.time()
+    lb   = lower_bound(inst)
+    if base is not None:
+        lb = max(lb, int(np.max(base, initial=0)))
+    hint = warm_start(inst, base)
+    build_ms, solve_ms = int((time.time() - t0) * 1000), 0
+    if progress is not None:
+        progress.log(hint[0], lb)
+    if hint[0] <= lb:
+        # greedy đã chạm cận dưới: tối ưu, không cần gọi SCIP
+        return hint[0], "OPTIMAL", hint[1], build_ms, solve_ms
+
+    solver = pywraplp.Solver.CreateSolver('SCIP')
+    if not solver:
+        return None, "ERROR", None, 0, 0
+    solver.set_time_limit(time_limit_ms)
+    # objective nguyên: khoảng cách tuyệt đối < 1 nghĩa là đã tối ưu
+    params = "limits/absgap = 0.999\n"
+    if stall_nodes is not None:
+        params += f"limits/stallnodes = {int(stall_nodes)}\n"
+    solver.SetSolverSpecificParametersAsString(params)
+
+    t0 = time.time()
+    error = solver.LoadModelFromProto(build_model(inst, lb, hint, base))
+    if error:
+        raise RuntimeError(f"LoadModelFromProto: {error}")
+    build_ms += int((time.time() - t0) * 1000)
 
     # Giải bài toán
-    status = solver.Solve()
+    t0 = time.time()
+    if progress is None:
+        result = solver.Solve()
+    else:
+        solver.EnableOutput()
+        fd, log_path = tempfile.mkstemp(suffix=".scip.log")
+        os.close(fd)
+        try:
+            with capture_stdout(log_path):
+                result = solver.Solve()
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                log_text = f.read()
+        finally:
+            os.remove(log_path)
+        offset = t0 - progress.start
+        for t, inc, bnd in scip_progress(log_text):
+            progress.log(inc, bnd, t=offset + t)
+    solve_ms = int((time.time() - t0) * 1000)
+    names = {pywraplp.Solver.OPTIMAL: "OPTIMAL", pywraplp.Solver.FEASIBLE: "FEASIBLE"}
+    if result not in names:
+        # hết giờ trước khi SCIP nhận nghiệm: nghiệm greedy vẫn hợp lệ
+        return hint[0], "FEASIBLE", hint[1], build_ms, solve_ms
+    obj = int(round(solver.Objective().Value()))
+    if progress is not None:
+        progress.log(obj, solver.Objective().BestBound())
+    x = solver.variables()[:inst.nnz]
+    chosen = np.array([v.solution_value() > 0.5 for v in x], dtype=bool)
+    return obj, names[result], chosen, build_ms, solve_ms
+
+def solve_reviewers_assignment_ilp(inst, output_file, time_limit_ms=600000, progress=None,
+                                   stall_nodes=None):
+    """
+    Giải bài toán phân công reviewer và ghi kết quả vào file output. Trả về
+    (objective, status, build_ms, solve_ms) như solve_scip. Không tạo được
+    SCIP thì báo lỗi thay vì ghi file, để batch_runner tính job là lỗi và
+    chạy lại khi resume.
+    """
+    obj, status, _, build_ms, solve_ms = solve_scip(inst, time_limit_ms, progress, stall_nodes)
+    if status == "ERROR":
+        raise RuntimeError("SCIP is not available in this OR-Tools build")
 
     # Ghi kết quả vào file output
     with open(output_file, 'w') as f:
-        if status == pywraplp.Solver.OPTIMAL:
-            f.write(f"{str(output_file).split("\\")[-1]}\n")
-            f.write(f"n = {n}\nm = {m}\n")
-            f.write(f"Objective Value: {int(max_load.solution_value())} OPTIMAL\n")
-        elif status == pywraplp.Solver.FEASIBLE:
-            f.write(f"{str(output_file).split("\\")[-1]}\n")
-            f.write(f"n = {n}\nm = {m}\n")
-            f.write(f"Objective Value: {int(max_load.solution_value())} FEASIBLE\n")     
-        else:
-            f.write("No solution found.\n")
+        f.write(f"{os.path.basename(output_file)}\n")
+        f.write(f"n = {inst.N}\nm = {inst.M}\n")
+        f.write(f"Objective Value: {obj} {status}\n")
+    return obj, status, build_ms, solve_ms
+
+def run_instance(input_path, output_path, stall_nodes=None):
+    """
+    Giải một instance và ghi kết quả kèm thời gian chạy vào output_path.
+    Tiến trình giải (incumbent, cận, gap theo thời gian) được ghi vào store.
+    """
+    inst = load_instance(input_path)
+    start_time, start_cpu = time.time(), time.process_time()  # Ghi lại thời điểm bắt đầu
+    progress = Progress(output_path, "ILP_Ortools", input_path, inst)
+    obj, status, build_ms, solve_ms = solve_reviewers_assignment_ilp(
+        inst, output_path, progress=progress, stall_nodes=stall_nodes)
+    end_time = time.time()    # Ghi lại thời điểm kết thúc
+    run_time = end_time - start_time  # Tính thời gian chạy
+    cpu_ms = int((time.process_time() - start_cpu) * 1000)
+    # Ghi thêm thời gian chạy vào file output
+    with open(output_path, 'a') as f:
+        f.write(f"{int(run_time * 1000)} ms\n")
+    record(output_path, "ILP_Ortools", input_path, inst, obj, status, int(run_time * 1000), cpu_ms,
+           params={"stall_nodes": stall_nodes}, build_ms=build_ms, solve_ms=solve_ms,
+           run=progress.run)
 
 def main():
     """Hàm chính để chạy solver trên tất cả file .txt trong thư mục 'instances' và ghi kết quả vào 'results'."""
@@ -84,14 +238,7 @@ def main():
         output_path = os.path.join(results_dir, output_filename)
         print(f"Đang xử lý file: {filename} -> {output_filename}")
         try:
-            n, m, b, paper_preferences = InputFile(input_path)
-            start_time = time.time()  # Ghi lại thời điểm bắt đầu
-            solve_reviewers_assignment_ilp(n, m, b, paper_preferences, output_path)
-            end_time = time.time()    # Ghi lại thời điểm kết thúc
-            run_time = end_time - start_time  # Tính thời gian chạy
-            # Ghi thêm thời gian chạy vào file output
-            with open(output_path, 'a') as f:
-                f.write(f"{int(run_time * 1000)} ms\n")
+            run_instance(input_path, output_path)
         except Exception as e:
             print(f"Lỗi khi xử lý file {filename}: {e}")
 
@@ -0,0 +1,299 @@
+import os, re, json, math, time, hashlib, sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import resource                     # không có trên Windows
+except ImportError:
+    resource = None
+
+STORE_NAME = "results.jsonl"
+DB_NAME    = "results.sqlite"
+
+_hash_cache: Dict[tuple, str] = {}
+
+
+def instance_hash(path: str) -> str:
+    """sha1 nội dung file instance (cache theo path, mtime, size)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key not in _hash_cache:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _hash_cache[key] = h.hexdigest()
+    return _hash_cache[key]
+
+
+def peak_memory_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)   # KB trên Linux
+
+
+def store_for(out_path: str) -> str:
+    """Store JSONL nằm cạnh các file kết quả văn bản."""
+    return os.path.join(os.path.dirname(os.path.abspath(out_path)), STORE_NAME)
+
+
+def append(store_path: str, rec: Dict[str, Any]):
+    """
+    Ghi một dòng JSON bằng một lệnh write() trên fd O_APPEND, nên nhiều tiến
+    trình (batch_runner) có thể ghi cùng một file mà không chen dòng.
+    """
+    line = (json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(store_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def record(out_path: str, method: str, in_path: str, inst, objective, status: str,
+           wall_ms: int, cpu_ms: int, seed: Optional[int] = None,
+           params: Optional[Dict[str, Any]] = None, assignment=None,
+           kind: str = "result", **extra):
+    """
+    Ghi một bản ghi kết quả vào store tương ứng với out_path. assignment:
+    danh sách reviewer của từng paper, ID 0-based như Instance.
+    """
+    rec = {
+        "kind":       kind,
+        "time":       time.time(),
+        "instance":   os.path.splitext(os.path.basename(in_path))[0],
+        "inst_hash":  instance_hash(in_path),
+        "n":          inst.N,
+        "m":          inst.M,
+        "b":          inst.b,
+        "method":     method,
+        "params":     params or {},
+        "seed":       seed,
+        "objective":  objective,
+        "status":     status,
+        "wall_ms":    wall_ms,
+        "cpu_ms":     cpu_ms,
+        "peak_kb":    peak_memory_kb(),
+    }
+    if assignment is not None:
+        rec["assignment"] = [list(map(int, row)) for row in assignment]
+    rec.update(extra)
+    append(store_for(out_path), rec)
+
+
+class Progress:
+    """
+    Nhật ký anytime của một lần chạy solver: mỗi khi incumbent hoặc cận dưới
+    đổi, ghi một bản ghi kind="progress" (t giây từ lúc tạo, incumbent, cận,
+    gap) vào store của out_path; bản ghi kết quả cuối nối với nó qua `run`.
+
+    log() trả về True khi gap không giảm trong stall_s giây (None = không bao
+    giờ), để callback của solver dừng sớm.
+    """
+
+    def __init__(self, out_path: str, method: str, in_path: str, inst,
+                 stall_s: Optional[float] = None):
+        self.store   = store_for(out_path)
+        self.start   = time.time()
+        self.run     = f"{os.getpid()}-{self.start:.6f}"
+        self.base    = {"kind": "progress", "run": self.run, "method": method,
+                        "instance": os.path.splitext(os.path.basename(in_path))[0],
+                        "inst_hash": instance_hash(in_path), "n": inst.N, "m": inst.M}
+        self.stall_s = stall_s
+        self.last    = (None, None)
+        self.best_gap, self.best_t = math.inf, 0.0
+        self.count   = 0
+
+    def log(self, incumbent, bound, t: Optional[float] = None) -> bool:
+        """t: giây kể từ lúc tạo; mặc định lấy theo đồng hồ hiện tại."""
+        t = time.time() - self.start if t is None else t
+        # objective nguyên: làm tròn cận lên (bỏ sai số dấu phẩy động) là vẫn hợp lệ
+        incumbent = None if incumbent is None else int(round(incumbent))
+        bound     = None if bound is None else int(math.ceil(bound - 1e-6))
+        if (incumbent, bound) != self.last:
+            self.last = (incumbent, bound)
+            gap = None
+            if incumbent is not None and bound is not None:
+                gap = (incumbent - bound) / incumbent if incumbent else 0.0
+                if gap < self.best_gap:
+                    self.best_gap, self.best_t = gap, t
+            append(self.store, dict(self.base, time=time.time(), t=round(t, 3),
+                                    incumbent=incumbent, bound=bound, gap=gap))
+            self.count += 1
+        return self.stall_s is not None and self.best_gap < math.inf \
+            and t - self.best_t >= self.stall_s
+
+
+def read_records(store_path: str, offset: int = 0) -> Iterable[tuple]:
+    """Sinh (offset sau dòng, record) từ vị trí offset; bỏ qua dòng cuối còn dở."""
+    with open(store_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                yield offset, json.loads(line)
+
+
+# ---------- SQLite index -------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id        INTEGER PRIMARY KEY,
+    instance  TEXT, inst_hash TEXT, n INTEGER, m INTEGER, b INTEGER,
+    method    TEXT, params TEXT, seed INTEGER,
+    objective REAL, status TEXT,
+    wall_ms   INTEGER, cpu_ms INTEGER, peak_kb INTEGER,
+    time      REAL,
+    build_ms  INTEGER, solve_ms INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_inst_method ON runs (instance, method);
+CREATE INDEX IF NOT EXISTS runs_method      ON runs (method);
+CREATE TABLE IF NOT EXISTS progress (
+    id        INTEGER PRIMARY KEY,
+    run       TEXT, instance TEXT, inst_hash TEXT, method TEXT,
+    t         REAL, incumbent INTEGER, bound INTEGER, gap REAL,
+    time      REAL
+);
+CREATE INDEX IF NOT EXISTS progress_run ON progress (run);
+CREATE TABLE IF NOT EXISTS ingest_state (store TEXT PRIMARY KEY, offset INTEGER);
+CREATE TABLE IF NOT EXISTS imported_files (path TEXT PRIMARY KEY, mtime REAL);
+"""
+
+RUN_COLUMNS = ["instance", "inst_hash", "n", "m", "b", "method", "params", "seed",
+               "objective", "status", "wall_ms", "cpu_ms", "peak_kb", "time",
+               "build_ms", "solve_ms"]
+PROGRESS_COLUMNS = ["run", "instance", "inst_hash", "method", "t", "incumbent", "bound",
+                    "gap", "time"]
+
+
+# cột thêm sau khi bảng runs đã có dữ liệu: (tên, kiểu) để nâng cấp DB cũ
+ADDED_RUN_COLUMNS = [("build_ms", "INTEGER"), ("solve_ms", "INTEGER")]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path)
+    con.executescript(SCHEMA)
+    have = {row[1] for row in con.execute("PRAGMA table_info(runs)")}
+    with con:
+        for name, kind in ADDED_RUN_COLUMNS:
+            if name not in have:
+                con.execute(f"ALTER TABLE runs ADD COLUMN {name} {kind}")
+    return con
+
+
+def ingest(con: sqlite3.Connection, store_path: str) -> int:
+    """
+    Nạp các dòng mới của store (từ offset lần trước) vào bảng runs và
+    progress; trả về số bản ghi kết quả đã nạp.
+    """
+    key = os.path.abspath(store_path)
+    row = con.execute("SELECT offset FROM ingest_state WHERE store = ?", (key,)).fetchone()
+    offset = row[0] if row else 0
+    if not os.path.exists(store_path) or os.path.getsize(store_path) < offset:
+        offset = 0
+
+    rows, progress, new_offset = [], [], offset
+    for new_offset, rec in read_records(store_path, offset):
+        kind = rec.get("kind", "result")
+        if kind == "progress":
+            progress.append(tuple(rec.get(c) for c in PROGRESS_COLUMNS))
+        if kind != "result":
+            continue
+        rec = dict(rec, params=json.dumps(rec.get("params") or {}, sort_keys=True))
+        rows.append(tuple(rec.get(c) for c in RUN_COLUMNS))
+
+    with con:
+        con.executemany(f"INSERT INTO runs ({', '.join(RUN_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(RUN_COLUMNS))})", rows)
+        con.executemany(f"INSERT INTO progress ({', '.join(PROGRESS_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(PROGRESS_COLUMNS))})", progress)
+        con.execute("INSERT OR REPLACE INTO ingest_state VALUES (?, ?)", (key, new_offset))
+    return len(rows)
+
+
+def latest_runs(con: sqlite3.Connection) -> List[sqlite3.Row]:
+    """
+    Bản ghi mới nhất cho mỗi bộ (instance, method, seed); các phương pháp chạy
+    nhiều seed có một dòng cho mỗi seed (seed NULL gộp thành một nhóm).
+    """
+    con.row_factory = sqlite3.Row
+    return con.execute("""
+        SELECT r.* FROM runs r
+        JOIN (SELECT MAX(id) AS id FROM runs GROUP BY instance, method, seed) last
+          ON r.id = last.id
+        ORDER BY r.instance, r.method, r.seed
+    """).fetchall()
+
+
+def time_to_gap(con: sqlite3.Connection, gap: float = 0.0) -> List[sqlite3.Row]:
+    """
+    Với mỗi lần chạy có nhật ký progress: thời điểm (giây) đầu tiên gap ≤ gap
+    (NULL nếu không đạt) và gap cuối cùng, để chọn time limit từ dữ liệu.
+    """
+    con.row_factory = sqlite3.Row
+    return con.execute("""
+        SELECT run, instance, method,
+               MIN(CASE WHEN gap <= ? THEN t END) AS t_reached,
+               MAX(t) AS t_last,
+               (SELECT p2.gap FROM progress p2 WHERE p2.run = p.run
+                 ORDER BY p2.t DESC, p2.id DESC LIMIT 1) AS final_gap
+        FROM progress p GROUP BY run ORDER BY instance, method, run
+    """, (gap,)).fetchall()
+
+
+# ---------- legacy text results -------------------------------------
+FILE_RE = re.compile(r"\[(.*?)\]\s*(.*?)(?:_seed(\d+))?\.txt$", re.I)   # batch_runner.result_name
+OBJ_RE  = re.compile(r"Objective Value:\s*([+-]?\d+(?:\.\d+)?)(?:[ \t]+(\w+))?", re.I)
+TIME_RE = re.compile(r"(\d+)\s*ms", re.I)
+N_RE    = re.compile(r"n\s*=\s*(\d+)", re.I)
+M_RE    = re.compile(r"m\s*=\s*(\d+)", re.I)
+
+
+def import_text_results(con: sqlite3.Connection, results_dir: str, store_path: str) -> int:
+    """
+    Chuyển các file kết quả văn bản thành bản ghi trong store, theo từng file.
+    Trạng thái import (tên file, mtime) nằm trong bảng imported_files cạnh
+    offset của ingest, nên mỗi lần gọi chỉ xét file mới hoặc đã đổi. File
+    đã có bản ghi solver cùng (instance, method, seed) không cũ hơn nó trong
+    bảng runs (solver ghi store ngay sau file văn bản) thì không nạp lại; vì
+    vậy hãy ingest store trước, và ingest lại sau nếu hàm trả về > 0.
+    Hậu tố _seed<N> của tên file (chạy nhiều seed) là seed, không thuộc tên
+    instance.
+    """
+    done = dict(con.execute("SELECT path, mtime FROM imported_files"))
+    count, marked = 0, []
+    for fname in sorted(os.listdir(results_dir)):
+        m = FILE_RE.match(fname)
+        if not m:
+            continue
+        path  = os.path.join(results_dir, fname)
+        mtime = os.path.getmtime(path)
+        key   = os.path.abspath(path)
+        if done.get(key) == mtime:
+            continue
+        marked.append((key, mtime))
+        method, sample, seed = m.groups()
+        seed = int(seed) if seed is not None else None
+        if con.execute("SELECT 1 FROM runs WHERE instance = ? AND method = ? "
+                       "AND (? IS NULL OR seed = ?) AND time >= ? LIMIT 1",
+                       (sample, method, seed, seed, mtime)).fetchone():
+            continue
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            txt = f.read()
+        obj = OBJ_RE.search(txt)
+        t   = TIME_RE.search(txt)
+        n   = N_RE.search(txt)
+        mm  = M_RE.search(txt)
+        append(store_path, {
+            "kind": "result", "time": mtime,
+            "instance": sample, "inst_hash": None,
+            "n": int(n.group(1)) if n else None, "m": int(mm.group(1)) if mm else None,
+            "b": None, "method": method, "params": {}, "seed": seed,
+            "objective": float(obj.group(1)) if obj else None,
+            "status": ((obj.group(2) or "").upper() or None) if obj else "NO_SOLUTION",
+            "wall_ms": int(t.group(1)) if t else None, "cpu_ms": None, "peak_kb": None,
+        })
+        count += 1
+    with con:
+        con.executemany("INSERT OR REPLACE INTO imported_files VALUES (?, ?)", marked)
+    return count